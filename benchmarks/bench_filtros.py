@@ -0,0 +1,78 @@
+"""Benchmark: cascata de filtros da barra lateral com varreduras booleanas x índice de filtros.
+
+Usa as etapas salvas concatenadas `--copias` vezes (cada cópia com categorias
+próprias) e resolve categoria → evento → subcategoria → piloto.
+
+Uso: python benchmarks/bench_filtros.py [--copias 10]
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from cronometragem.armazenamento import carregar_etapa_enriquecida  # noqa: E402
+from cronometragem.compacto import compactar_etapa  # noqa: E402
+from cronometragem.indice import construir_indice, linhas_filtro, opcoes_filtro  # noqa: E402
+from cronometragem.processamento import COL_CATEGORIA, COL_EVENTO, COL_PILOTO, COL_SUBCATEGORIA  # noqa: E402
+
+
+def cascata_antiga(df, cat, ev):
+    """Filtros originais do `main_app`: uma varredura e um `sorted(unique())` por nível (referência)."""
+    df_cat = df[df[COL_CATEGORIA] == cat]
+    sorted(df_cat[COL_EVENTO].dropna().unique())
+    df_ev = df_cat[df_cat[COL_EVENTO] == ev]
+    subcats = sorted(df_ev[COL_SUBCATEGORIA].dropna().unique())
+    df_sub = df_ev[df_ev[COL_SUBCATEGORIA].isin(subcats)]
+    pilotos = sorted(df_sub[COL_PILOTO].dropna().unique())
+    return df_sub[df_sub[COL_PILOTO].isin(pilotos)].index.to_numpy()
+
+
+def cascata_indice(indice, cat, ev):
+    opcoes_filtro(indice, cat)
+    subcats = opcoes_filtro(indice, cat, ev)
+    pilotos = opcoes_filtro(indice, cat, ev, subcats)
+    return linhas_filtro(indice, cat, ev, subcats, pilotos)
+
+
+def cronometrar(funcao, repeticoes=20):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copias", type=int, default=10)
+    args = parser.parse_args()
+
+    pasta = os.path.join(RAIZ, "etapas_salvas")
+    subcat = os.path.join(RAIZ, "pilotos_subcategoria.csv")
+    etapas = [carregar_etapa_enriquecida(os.path.join(pasta, f), subcat)[0]
+              for f in sorted(os.listdir(pasta)) if f.lower().endswith(".csv")]
+    base = pd.concat(etapas, ignore_index=True)
+    base[COL_CATEGORIA] = base[COL_CATEGORIA].astype(str)
+    df = pd.concat([base.assign(**{COL_CATEGORIA: base[COL_CATEGORIA] + f" #{i}"}) for i in range(args.copias)], ignore_index=True)
+
+    inicio = time.perf_counter()
+    indice = construir_indice(compactar_etapa(df))
+    t_construir = time.perf_counter() - inicio
+    print(f"{len(df)} voltas | índice montado em {t_construir * 1000:.1f} ms")
+
+    cat = opcoes_filtro(indice)[0]
+    ev = opcoes_filtro(indice, cat)[0]
+    t_antigo, antigo = cronometrar(lambda: cascata_antiga(df, cat, ev))
+    t_novo, novo = cronometrar(lambda: cascata_indice(indice, cat, ev))
+    assert (antigo == novo).all(), "linhas diferentes"
+    print(f"cascata  antigo {t_antigo * 1000:8.2f} ms | índice {t_novo * 1000:6.3f} ms | {t_antigo / t_novo:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Benchmark: leitura sequencial x `ler_exportacoes` em paralelo sobre N exportações sintéticas.
+
+Uso: python benchmarks/bench_ingestao.py [--arquivos 40] [--pilotos 30] [--voltas 40] [--workers N] [--processos]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.sintetico import gerar_arquivos  # noqa: E402
+from cronometragem.processamento import ler_csv_original, ler_exportacoes  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--arquivos", type=int, default=40)
+    parser.add_argument("--pilotos", type=int, default=30)
+    parser.add_argument("--voltas", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--processos", action="store_true", help="usa pool de processos em vez de threads")
+    args = parser.parse_args()
+
+    arquivos = gerar_arquivos(args.arquivos, args.pilotos, args.voltas)
+    mb = sum(len(c) for _, c in arquivos) / 1e6
+    print(f"{args.arquivos} arquivos, {mb:.1f} MB, {args.arquivos * args.pilotos * args.voltas} voltas")
+
+    inicio = time.perf_counter()
+    dfs = [ler_csv_original(io.BytesIO(conteudo), filename=nome) for nome, conteudo in arquivos]
+    sequencial = pd.concat([df for df in dfs if not df.empty], ignore_index=True)
+    t_seq = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    paralelo, falhas = ler_exportacoes(arquivos, max_workers=args.workers, usar_processos=args.processos)
+    t_par = time.perf_counter() - inicio
+
+    pd.testing.assert_frame_equal(sequencial, paralelo)
+    assert not falhas, falhas
+    print(f"sequencial: {t_seq:.3f} s | paralelo: {t_par:.3f} s | ganho {t_seq / t_par:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
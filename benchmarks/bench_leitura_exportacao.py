@@ -0,0 +1,66 @@
+"""Benchmark de memória e vazão: leitor antigo (decode + python engine) x `ler_exportacao`.
+
+Uso: python benchmarks/bench_leitura_exportacao.py [--pilotos 60] [--voltas 400]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+import tracemalloc
+from io import StringIO
+
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.sintetico import gerar_exportacao  # noqa: E402
+from cronometragem.processamento import COL_PILOTO, ler_exportacao  # noqa: E402
+
+
+def ler_exportacao_antiga(conteudo):
+    """Corpo de leitura de `ler_csv_original` antes do leitor em bytes (referência)."""
+    content_as_string = conteudo.decode("utf-8", "ignore")
+    lines = [l.strip() for l in content_as_string.splitlines() if l.strip()]
+    header_line_index = next((i for i, line in enumerate(lines) if "Lap Tm" in line and "Lap" in line), -1)
+    df_alt = pd.read_csv(StringIO("\n".join(lines[header_line_index:])), sep=',', quotechar='"', engine='python')
+    hora_pat = re.compile(r"^\d{1,2}:\d{2}:\d{2}\.\d{1,3}$")
+    col_hora = next((c for c in df_alt.columns if "Time" in c), None)
+    df_alt["Piloto_tmp"] = df_alt[col_hora].where(~df_alt[col_hora].str.match(hora_pat, na=False)).ffill()
+    return df_alt.dropna(subset=['Lap', 'Lap Tm'])
+
+
+def medir(funcao):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcao()
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duracao, pico, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pilotos", type=int, default=60)
+    parser.add_argument("--voltas", type=int, default=400)
+    args = parser.parse_args()
+
+    conteudo = gerar_exportacao(args.pilotos, args.voltas)
+    mb = len(conteudo) / 1e6
+    print(f"exportação sintética: {mb:.1f} MB, {args.pilotos * args.voltas} voltas")
+
+    t_antigo, pico_antigo, antigo = medir(lambda: ler_exportacao_antiga(conteudo))
+    t_novo, pico_novo, novo = medir(lambda: ler_exportacao(conteudo, filename="SINTETICA - ENDURANCE - LAPTIMES.CSV"))
+
+    assert antigo["Piloto_tmp"].tolist() == novo[COL_PILOTO].tolist()
+    assert len(antigo) == len(novo)
+
+    for nome, t, pico in (("antigo", t_antigo, pico_antigo), ("novo", t_novo, pico_novo)):
+        print(f"{nome:<7} {t:8.3f} s  {mb / t:7.1f} MB/s  pico {pico / 1e6:7.1f} MB")
+    print(f"vazão {t_antigo / t_novo:.1f}x, pico de memória {pico_antigo / pico_novo:.1f}x menor")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Micro-benchmark: `parse_tempo` (célula a célula) x `parse_tempo_coluna`.
+
+Uso: python benchmarks/bench_parse_tempo.py [--repeticoes N]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from cronometragem.processamento import COLS_TEMPO, parse_tempo, parse_tempo_coluna  # noqa: E402
+
+
+def cronometrar(funcao, repeticoes):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    arquivos = sorted(glob.glob(os.path.join(RAIZ, "etapas_salvas", "*.csv")))
+    print(f"{'Etapa':<34} {'células':>8} {'apply (s)':>10} {'coluna (s)':>11} {'ganho':>7}")
+    total_antigo = total_novo = 0.0
+    for caminho in arquivos:
+        df = pd.read_csv(caminho, sep=';', encoding='utf-8-sig', low_memory=False)
+        colunas = [c for c in COLS_TEMPO if c in df.columns]
+
+        t_antigo, antigo = cronometrar(lambda: {c: df[c].apply(parse_tempo) for c in colunas}, args.repeticoes)
+        t_novo, novo = cronometrar(lambda: {c: parse_tempo_coluna(df[c]) for c in colunas}, args.repeticoes)
+
+        for c in colunas:
+            pd.testing.assert_series_equal(antigo[c].astype("timedelta64[ns]"), novo[c], check_names=False)
+
+        total_antigo += t_antigo
+        total_novo += t_novo
+        celulas = len(df) * len(colunas)
+        print(f"{os.path.basename(caminho):<34} {celulas:>8} {t_antigo:>10.4f} {t_novo:>11.4f} {t_antigo / t_novo:>6.1f}x")
+
+    print(f"{'TOTAL':<34} {'':>8} {total_antigo:>10.4f} {total_novo:>11.4f} {total_antigo / total_novo:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Benchmark: classificação das voltas + análise de stints nas etapas de endurance.
+
+Uso: python benchmarks/bench_stints.py [--copias 1]
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from cronometragem.armazenamento import carregar_etapa  # noqa: E402
+from cronometragem.compacto import compactar_etapa  # noqa: E402
+from cronometragem.processamento import COL_EVENTO, preparar_etapa  # noqa: E402
+from cronometragem.stints import analisar_stints  # noqa: E402
+from cronometragem.validade import classificar_voltas  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copias", type=int, default=1, help="repete cada etapa (sessões renomeadas) para simular arquivos maiores")
+    args = parser.parse_args()
+
+    pasta = os.path.join(RAIZ, "etapas_salvas")
+    subcat = os.path.join(RAIZ, "pilotos_subcategoria.csv")
+    for arquivo in sorted(f for f in os.listdir(pasta) if "ENDURANCE" in f.upper() and f.lower().endswith(".csv")):
+        df, _ = preparar_etapa(carregar_etapa(os.path.join(pasta, arquivo)), subcat)
+        if args.copias > 1:
+            df[COL_EVENTO] = df[COL_EVENTO].astype(str)
+            df = pd.concat([df.assign(**{COL_EVENTO: df[COL_EVENTO] + f" #{i}"}) for i in range(args.copias)], ignore_index=True)
+        df = compactar_etapa(df)
+
+        inicio = time.perf_counter()
+        classificada = classificar_voltas(df)
+        t_classificar = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        _, resumo = analisar_stints(classificada)
+        t_stints = time.perf_counter() - inicio
+        print(f"{arquivo:<32} {len(df):>7} voltas | {len(resumo):>5} stints | classificação {t_classificar * 1000:7.1f} ms "
+              f"| stints {t_stints * 1000:7.1f} ms | total {(t_classificar + t_stints) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
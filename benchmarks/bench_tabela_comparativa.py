@@ -0,0 +1,75 @@
+"""Benchmark: HTML de comparação com `iterrows` x `tabela_comparativa_html` (40 pilotos x 60 voltas).
+
+Uso: python benchmarks/bench_tabela_comparativa.py [--pilotos 40] [--voltas 60]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from cronometragem.processamento import fmt_tempo, formatar_diff_span  # noqa: E402
+from cronometragem.tabelas import CSS_COMPARACAO, tabela_comparativa_html  # noqa: E402
+
+
+def tabela_antiga(pivot, colunas, referencia, tempo, unidade):
+    """Laço original das abas de comparação (referência)."""
+    html = f"{CSS_COMPARACAO}<div class='table-container'><table class='comp-table'><thead><tr><th>Volta</th>"
+    for p in colunas: html += f"<th>{p}</th>"
+    html += "</tr></thead><tbody>"
+    for volta, row in pivot.iterrows():
+        html += f"<tr><td><b>{int(volta)}</b></td>"
+        dado_ref = row.get(referencia)
+        for p in colunas:
+            dado_atual = row.get(p)
+            diff_str = ""
+            if p != referencia and referencia and pd.notna(dado_atual) and pd.notna(dado_ref):
+                diff_str = f"<span class='diff-span'>{formatar_diff_span(dado_atual - dado_ref, unit=unidade)}</span>"
+            valor_str = fmt_tempo(dado_atual) if tempo else (f"{dado_atual:.1f}" if pd.notna(dado_atual) else "---")
+            html += f"<td>{valor_str} {unidade}{diff_str}</td>"
+        html += "</tr>"
+    return html + "</tbody></table></div>"
+
+
+def pivots_sinteticos(n_pilotos, n_voltas, seed=0):
+    rng = np.random.default_rng(seed)
+    pilotos = [f"Piloto {i:02d}" for i in range(n_pilotos)]
+    ms = rng.integers(95_000, 99_000, size=(n_voltas, n_pilotos)).astype(float)
+    ms[rng.random(ms.shape) < 0.05] = np.nan
+    indice = pd.Index(np.arange(1, n_voltas + 1, dtype=float), name="Volta")
+    tempos = pd.DataFrame({p: pd.to_timedelta(ms[:, i], unit="ms") for i, p in enumerate(pilotos)}, index=indice)
+    velocidades = pd.DataFrame(rng.uniform(180, 230, size=(n_voltas, n_pilotos)), index=indice, columns=pilotos)
+    return pilotos, tempos, velocidades
+
+
+def cronometrar(funcao, repeticoes=5):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pilotos", type=int, default=40)
+    parser.add_argument("--voltas", type=int, default=60)
+    args = parser.parse_args()
+
+    pilotos, tempos, velocidades = pivots_sinteticos(args.pilotos, args.voltas)
+    for nome, pivot, tempo, unidade in (("Tempo de Volta", tempos, True, ""), ("Velocidade", velocidades, False, "km/h")):
+        argumentos = (pivot, pilotos, pilotos[0], tempo, unidade)
+        t_antigo, antigo = cronometrar(lambda: tabela_antiga(*argumentos))
+        t_novo, novo = cronometrar(lambda: tabela_comparativa_html(*argumentos))
+        assert antigo == novo, f"HTML diferente em {nome}"
+        print(f"{nome:<15} antigo {t_antigo * 1000:8.1f} ms | novo {t_novo * 1000:7.1f} ms | {t_antigo / t_novo:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
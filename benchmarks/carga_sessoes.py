@@ -0,0 +1,143 @@
+"""Teste de carga: N sessões simultâneas abrindo etapas, com cópia por sessão x cache compartilhado.
+
+Cada sessão é uma thread que faz `--execucoes` reexecuções: obtém a etapa
+(sorteada entre as `--etapas` primeiras de `etapas_salvas`, então várias
+sessões disputam a mesma), resolve a cascata de filtros para uma categoria e
+um evento sorteados e expande a seleção. Uma barreira segura todas as sessões
+com a etapa em mãos ao mesmo tempo, e é nesse ponto que a memória é medida:
+a residente do processo e a soma das etapas distintas em mãos (`tamanho_mb`),
+que não depende do alocador.
+
+- `copia`: como o `st.cache_data`, que guarda a etapa serializada e entrega
+  uma cópia desserializada a cada execução;
+- `compartilhado`: `CacheEtapas`, que entrega o mesmo objeto a todas as
+  sessões (com orçamento de `--orcamento-mb`).
+
+Cada modo roda num subprocesso próprio, para a memória de um não contaminar
+a do outro.
+
+Uso: python benchmarks/carga_sessoes.py [--sessoes 12] [--etapas 2] [--execucoes 3] [--orcamento-mb 512]
+"""
+import argparse
+import json
+import os
+import pickle
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from cronometragem.agregados import calcular_agregados  # noqa: E402
+from cronometragem.armazenamento import carregar_etapa_enriquecida  # noqa: E402
+from cronometragem.compacto import compactar_etapa, expandir_etapa  # noqa: E402
+from cronometragem.compartilhado import CacheEtapas, tamanho_mb  # noqa: E402
+from cronometragem.indice import construir_indice, linhas_filtro, opcoes_filtro  # noqa: E402
+from cronometragem.perfil import memoria_mb  # noqa: E402
+from cronometragem.stints import analisar_stints  # noqa: E402
+
+PASTA_ETAPAS = os.path.join(RAIZ, "etapas_salvas")
+CAMINHO_SUBCAT = os.path.join(RAIZ, "pilotos_subcategoria.csv")
+MODOS = ["copia", "compartilhado"]
+
+
+def montar_etapa(caminho):
+    """Mesmo pacote que o app monta por etapa salva (`montar_etapa` do app.py)."""
+    df, erro, nao_cadastrados = carregar_etapa_enriquecida(caminho, CAMINHO_SUBCAT)
+    df = compactar_etapa(df)
+    return df, erro, calcular_agregados(expandir_etapa(df)), construir_indice(df), analisar_stints(df), nao_cadastrados
+
+
+class CacheCopia:
+    """Emula o `st.cache_data`: guarda a etapa serializada e desserializa uma cópia a cada acesso."""
+
+    def __init__(self):
+        self._entradas = {}
+        self._trava = threading.Lock()
+
+    def obter(self, chave, montar):
+        with self._trava:
+            if chave not in self._entradas:
+                self._entradas[chave] = pickle.dumps(montar(), protocol=pickle.HIGHEST_PROTOCOL)
+            dados = self._entradas[chave]
+        return pickle.loads(dados)
+
+
+def sessao(cache, caminhos, execucoes, barreira, semente, latencias, em_maos):
+    rng = random.Random(semente)
+    for i in range(execucoes):
+        inicio = time.perf_counter()
+        caminho = rng.choice(caminhos)
+        etapa = cache.obter(caminho, lambda: montar_etapa(caminho))
+        df, _, _, indice, _, _ = etapa
+        cat = rng.choice(opcoes_filtro(indice))
+        ev = rng.choice(opcoes_filtro(indice, cat))
+        selecao = expandir_etapa(df.take(linhas_filtro(indice, cat, ev)))
+        latencias.append(time.perf_counter() - inicio)
+        if i == 0:
+            # Todas as sessões com a etapa (e a seleção) em mãos ao mesmo tempo.
+            em_maos.append(etapa)
+            barreira.wait()
+            barreira.wait()
+        del etapa, df, indice, selecao
+
+
+def rodar_modo(modo, n_sessoes, n_etapas, execucoes, orcamento_mb):
+    caminhos = sorted(os.path.join(PASTA_ETAPAS, f) for f in os.listdir(PASTA_ETAPAS) if f.lower().endswith(".csv"))[:n_etapas]
+    cache = CacheEtapas(orcamento_mb) if modo == "compartilhado" else CacheCopia()
+    memoria_inicial = memoria_mb()
+    barreira = threading.Barrier(n_sessoes + 1, timeout=600)
+    latencias, em_maos = [], []
+    threads = [threading.Thread(target=sessao, args=(cache, caminhos, execucoes, barreira, s, latencias, em_maos)) for s in range(n_sessoes)]
+    inicio = time.perf_counter()
+    for t in threads: t.start()
+    barreira.wait()
+    memoria_pico = memoria_mb()
+    etapas_mb = sum(tamanho_mb(e) for e in {id(e): e for e in em_maos}.values())
+    em_maos.clear()
+    barreira.wait()
+    for t in threads: t.join()
+    total = time.perf_counter() - inicio
+    resultado = {
+        "modo": modo, "sessoes": n_sessoes, "etapas": len(caminhos), "execucoes": execucoes,
+        "memoria_mb": round(memoria_pico - memoria_inicial, 1) if memoria_inicial is not None else None,
+        "etapas_mb": round(etapas_mb, 2),
+        "total_s": round(total, 2),
+        "latencia_p50_ms": round(float(np.percentile(latencias, 50)) * 1000, 1),
+        "latencia_p95_ms": round(float(np.percentile(latencias, 95)) * 1000, 1),
+    }
+    if modo == "compartilhado": resultado["cache"] = cache.estatisticas()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0], formatter_class=argparse.RawDescriptionHelpFormatter, epilog=__doc__)
+    parser.add_argument("--sessoes", type=int, default=12)
+    parser.add_argument("--etapas", type=int, default=2, help="quantas etapas salvas as sessões disputam")
+    parser.add_argument("--execucoes", type=int, default=3, help="reexecuções por sessão")
+    parser.add_argument("--orcamento-mb", type=float, default=512)
+    parser.add_argument("--modo", choices=MODOS, help="roda só este modo, no processo atual (saída em JSON)")
+    args = parser.parse_args()
+
+    if args.modo:
+        print(json.dumps(rodar_modo(args.modo, args.sessoes, args.etapas, args.execucoes, args.orcamento_mb)))
+        return
+
+    print(f"{args.sessoes} sessões, {args.etapas} etapa(s), {args.execucoes} execuções por sessão")
+    for modo in MODOS:
+        saida = subprocess.run([sys.executable, os.path.abspath(__file__), "--modo", modo, "--sessoes", str(args.sessoes),
+                                "--etapas", str(args.etapas), "--execucoes", str(args.execucoes), "--orcamento-mb", str(args.orcamento_mb)],
+                               capture_output=True, text=True, check=True).stdout
+        r = json.loads(saida.strip().splitlines()[-1])
+        rss = "n/d" if r["memoria_mb"] is None else f"{r['memoria_mb']:+7.1f} MB"
+        print(f"{modo:<14} etapas em mãos {r['etapas_mb']:7.2f} MB | RSS {rss} | total {r['total_s']:6.2f} s | "
+              f"p50 {r['latencia_p50_ms']:7.1f} ms | p95 {r['latencia_p95_ms']:7.1f} ms" + (f" | cache {r['cache']}" if "cache" in r else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Casos fixos da classificação das voltas, conferidos nas etapas salvas.
+
+Cada caso é uma volta de um piloto numa sessão e o valor esperado das colunas
+de classificação. Sai com código 1 se algum caso divergir.
+
+Uso: python benchmarks/casos_validade.py
+"""
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from cronometragem.armazenamento import carregar_etapa_enriquecida  # noqa: E402
+from cronometragem.processamento import COL_EVENTO, COL_PILOTO, COL_VOLTA  # noqa: E402
+from cronometragem.validade import COL_ENTRADA, COL_LENTA, COL_VALIDA  # noqa: E402
+
+PASTA_ETAPAS = os.path.join(RAIZ, "etapas_salvas")
+CAMINHO_SUBCAT = os.path.join(RAIZ, "pilotos_subcategoria.csv")
+
+# (arquivo, evento, piloto, volta, esperado)
+CASOS = [
+    # Volta de 2:03.306 antes de duas sob safety car (2:46, 2:36): com a
+    # mediana móvel centrada ela passava por válida.
+    ("25ET5 - ALGARVE ENDURANCE.csv", "CORRIDA", "M.Müller / F.Fraga - CAR", 5, {COL_LENTA: True, COL_VALIDA: False}),
+    ("25ET5 - ALGARVE ENDURANCE.csv", "CORRIDA", "M.Müller / F.Fraga - CAR", 4, {COL_VALIDA: True}),
+    # Volta de entrada de 2:01.412 (sem S3).
+    ("25ET3 - INTERLAGOS.csv", "TREINO OFICIAL OPCIONAL EXTRA", "Denis FERRER - TROPHY", 4, {COL_ENTRADA: True, COL_VALIDA: False}),
+]
+
+
+def main():
+    etapas, falhas = {}, 0
+    for arquivo, evento, piloto, volta, esperado in CASOS:
+        if arquivo not in etapas:
+            etapas[arquivo] = carregar_etapa_enriquecida(os.path.join(PASTA_ETAPAS, arquivo), CAMINHO_SUBCAT)[0]
+        df = etapas[arquivo]
+        linha = df[(df[COL_EVENTO] == evento) & (df[COL_PILOTO] == piloto) & (df[COL_VOLTA] == volta)]
+        rotulo = f"{arquivo} | {evento} | {piloto} | volta {volta}"
+        if len(linha) != 1:
+            print(f"FALHA {rotulo}: {len(linha)} linhas encontradas")
+            falhas += 1
+            continue
+        obtido = {c: bool(linha[c].iloc[0]) for c in esperado}
+        ok = obtido == esperado
+        falhas += not ok
+        print(f"{'ok   ' if ok else 'FALHA'} {rotulo}: {obtido}" + ("" if ok else f" (esperado {esperado})"))
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Relatório de memória: etapas salvas no formato padrão x compacto.
+
+Uso: python benchmarks/memoria_etapas.py [--pasta etapas_salvas] [--subcat pilotos_subcategoria.csv]
+"""
+import argparse
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from cronometragem.armazenamento import carregar_etapa_enriquecida  # noqa: E402
+from cronometragem.compacto import compactar_etapa, expandir_etapa, relatorio_memoria  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pasta", default=os.path.join(RAIZ, "etapas_salvas"))
+    parser.add_argument("--subcat", default=os.path.join(RAIZ, "pilotos_subcategoria.csv"))
+    args = parser.parse_args()
+
+    etapas = {}
+    for arquivo in sorted(f for f in os.listdir(args.pasta) if f.lower().endswith(".csv")):
+        df, _, _ = carregar_etapa_enriquecida(os.path.join(args.pasta, arquivo), args.subcat)
+        assert expandir_etapa(compactar_etapa(df)).equals(df), f"ida e volta diferente em {arquivo}"
+        etapas[arquivo] = df
+
+    relatorio = relatorio_memoria(etapas)
+    print(relatorio.to_string(index=False))
+    padrao, compacta = relatorio["Padrão (MB)"].sum(), relatorio["Compacta (MB)"].sum()
+    print(f"\nTotal: padrão {padrao:.2f} MB | compacta {compacta:.2f} MB | {padrao / compacta:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
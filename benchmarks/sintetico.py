@@ -0,0 +1,57 @@
+"""Gerador de exportações sintéticas no formato do sistema de cronometragem.
+
+O layout imita os arquivos "<CATEGORIA> - <SESSÃO> - LAPTIMES.CSV" lidos por
+`ler_csv_original`: algumas linhas de preâmbulo, o cabeçalho com "Lap Tm" e,
+para cada piloto, uma linha com o nome seguida das suas voltas.
+"""
+import random
+
+CABECALHO = '"Time of Day","Lap","Lap Tm","S1 Tm","S2 Tm","S3 Tm","Speed"'
+
+
+def _fmt_volta(ms):
+    return f"{ms // 60000}:{ms // 1000 % 60:02d}.{ms % 1000:03d}"
+
+
+def _fmt_setor(ms):
+    return f"{ms // 1000}.{ms % 1000:03d}" if ms < 60000 else _fmt_volta(ms)
+
+
+def _fmt_hora(ms):
+    return f"{ms // 3600000}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d}.{ms % 1000:03d}"
+
+
+def nome_piloto(i):
+    return f"{100 + i} - Piloto {i:03d} SINTETICO - TROPHY"
+
+
+def linhas_voltas(rng, volta_ini, n_voltas, hora_ms, base_ms=95000):
+    """Gera `n_voltas` linhas de volta a partir de `volta_ini`; retorna (linhas, hora_final_ms)."""
+    linhas = []
+    for volta in range(volta_ini, volta_ini + n_voltas):
+        s1 = int(base_ms * 0.30) + rng.randint(0, 1500)
+        s2 = int(base_ms * 0.28) + rng.randint(0, 1500)
+        s3 = int(base_ms * 0.42) + rng.randint(0, 1500)
+        tt = s1 + s2 + s3
+        hora_ms += tt
+        vel = f"{rng.uniform(180, 230):.3f}".replace(".", ",")
+        linhas.append(f'"{_fmt_hora(hora_ms)}","{volta}","{_fmt_volta(tt)}","{_fmt_setor(s1)}",'
+                      f'"{_fmt_setor(s2)}","{_fmt_setor(s3)}","{vel}"')
+    return linhas, hora_ms
+
+
+def gerar_exportacao(n_pilotos=30, voltas_por_piloto=20, seed=0):
+    """Conteúdo (bytes) de uma exportação com `n_pilotos` x `voltas_por_piloto` voltas."""
+    rng = random.Random(seed)
+    linhas = ["Resultados sintéticos", "Sessão gerada para benchmark", "", CABECALHO]
+    for i in range(n_pilotos):
+        linhas.append(f'"{nome_piloto(i)}","","","","","",""')
+        voltas, _ = linhas_voltas(rng, 1, voltas_por_piloto, 9 * 3600000 + rng.randint(0, 60000))
+        linhas.extend(voltas)
+    return ("\r\n".join(linhas) + "\r\n").encode("utf-8")
+
+
+def gerar_arquivos(n_arquivos, n_pilotos=30, voltas_por_piloto=20):
+    """Lista de `(nome, conteúdo)` como os arquivos enviados na Ferramenta de Consolidação."""
+    return [(f"SINTETICA - SESSAO {i + 1} - LAPTIMES.CSV", gerar_exportacao(n_pilotos, voltas_por_piloto, seed=i))
+            for i in range(n_arquivos)]
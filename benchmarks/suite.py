@@ -0,0 +1,203 @@
+"""Suíte de benchmarks e regressão dos caminhos quentes, sem a interface do Streamlit.
+
+Roda cada caso sobre as etapas de `etapas_salvas` e sobre etapas sintéticas
+escaladas (10x/100x as voltas de uma etapa média), mede tempo (melhor de N
+repetições) e pico de memória (tracemalloc, numa execução à parte; cobre as
+alocações do Python e do NumPy, não as do pool do Arrow) e grava
+tudo em JSON. Com `--baseline`, compara com os resultados guardados e sai com
+código 1 se algum caso passar do limite.
+
+O baseline é específico da máquina: gere-o de novo com `--gravar-baseline`
+ao trocar de servidor ou depois de uma otimização aceita.
+
+Uso:
+    python benchmarks/suite.py                               # mede e compara com benchmarks/baseline.json
+    python benchmarks/suite.py --escalas 10 100 --saida resultados.json
+    python benchmarks/suite.py --gravar-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.sintetico import gerar_arquivos  # noqa: E402
+from cronometragem.agregados import calcular_agregados, filtrar_agregados, maiores_velocidades, melhores_voltas  # noqa: E402
+from cronometragem.armazenamento import ler_etapa_csv  # noqa: E402
+from cronometragem.compacto import compactar_etapa, expandir_etapa  # noqa: E402
+from cronometragem.exportacao import exportar_excel, planilhas_exportacao  # noqa: E402
+from cronometragem.indice import construir_indice, linhas_filtro, opcoes_filtro  # noqa: E402
+from cronometragem.processamento import (  # noqa: E402
+    COL_CATEGORIA, COL_EVENTO, COL_PILOTO, COL_TT, COL_VOLTA,
+    aplicar_subcategorias, ler_exportacoes, ler_mapa_subcategorias, normalizar_tipos_dados, preparar_etapa,
+)
+from cronometragem.stints import analisar_stints  # noqa: E402
+from cronometragem.tabelas import tabela_comparativa_html  # noqa: E402
+from cronometragem.validade import classificar_voltas  # noqa: E402
+
+PASTA_ETAPAS = os.path.join(RAIZ, "etapas_salvas")
+CAMINHO_SUBCAT = os.path.join(RAIZ, "pilotos_subcategoria.csv")
+BASELINE = os.path.join(RAIZ, "benchmarks", "baseline.json")
+PILOTOS_SINTETICOS, VOLTAS_SINTETICAS = 40, 25
+
+
+# --- DADOS ---
+def dados_etapa(bruto, exportacoes=None):
+    """Entradas de todos os casos a partir de uma etapa crua (como salva em CSV)."""
+    tipado = normalizar_tipos_dados(bruto.copy())
+    preparado, _ = preparar_etapa(bruto, CAMINHO_SUBCAT)
+    classificado = classificar_voltas(preparado)
+    compacto = compactar_etapa(classificado)
+    agregados = calcular_agregados(classificado)
+    # Sessão com mais voltas: é a que mais pesa nas abas de comparação.
+    cat, ev = classificado.groupby([COL_CATEGORIA, COL_EVENTO], observed=True).size().idxmax()
+    sessao = classificado[(classificado[COL_CATEGORIA] == cat) & (classificado[COL_EVENTO] == ev)]
+    pivot = sessao.pivot_table(index=COL_VOLTA, columns=COL_PILOTO, values=COL_TT, observed=True)
+    return {
+        "bruto": bruto, "exportacoes": exportacoes, "tipado": tipado, "classificado": classificado,
+        "compacto": compacto, "agregados": agregados, "categoria": cat, "evento": ev,
+        "pilotos": list(pivot.columns), "pivot": pivot, "mapa": ler_mapa_subcategorias(CAMINHO_SUBCAT),
+    }
+
+def etapas_salvas():
+    for arquivo in sorted(f for f in os.listdir(PASTA_ETAPAS) if f.lower().endswith(".csv")):
+        yield os.path.splitext(arquivo)[0], lambda arquivo=arquivo: dados_etapa(ler_etapa_csv(os.path.join(PASTA_ETAPAS, arquivo)))
+
+def etapa_sintetica(escala, voltas_base):
+    """Etapa sintética com ~`escala` x `voltas_base` voltas, com as exportações cruas de origem."""
+    n_arquivos = max(1, round(escala * voltas_base / (PILOTOS_SINTETICOS * VOLTAS_SINTETICAS)))
+    exportacoes = gerar_arquivos(n_arquivos, PILOTOS_SINTETICOS, VOLTAS_SINTETICAS)
+    bruto, _ = ler_exportacoes(exportacoes, max_workers=1)
+    return dados_etapa(bruto, exportacoes)
+
+
+# --- CASOS ---
+def _abas_agregados(d):
+    ag = filtrar_agregados(d["agregados"], d["categoria"], d["evento"], d["pilotos"])
+    return melhores_voltas(d["classificado"], ag), maiores_velocidades(d["classificado"], ag)
+
+def _filtros(d):
+    indice = construir_indice(d["compacto"])
+    subcats = opcoes_filtro(indice, d["categoria"], d["evento"])
+    pilotos = opcoes_filtro(indice, d["categoria"], d["evento"], subcats)
+    return expandir_etapa(d["compacto"].take(linhas_filtro(indice, d["categoria"], d["evento"], subcats, pilotos)))
+
+CASOS = {
+    "ler_exportacoes": lambda d: ler_exportacoes(d["exportacoes"], max_workers=1),
+    "normalizar_tipos_dados": lambda d: normalizar_tipos_dados(d["bruto"].copy()),
+    "aplicar_subcategorias": lambda d: aplicar_subcategorias(d["tipado"], d["mapa"]),
+    "preparar_etapa": lambda d: preparar_etapa(d["bruto"], CAMINHO_SUBCAT),
+    "classificar_voltas": lambda d: classificar_voltas(d["compacto"]),
+    "calcular_agregados": lambda d: calcular_agregados(d["classificado"]),
+    "abas_agregados": _abas_agregados,
+    "filtros": _filtros,
+    "analisar_stints": lambda d: analisar_stints(d["compacto"]),
+    "tabela_comparativa_html": lambda d: tabela_comparativa_html(d["pivot"], d["pilotos"], d["pilotos"][0]),
+    "exportar_excel": lambda d: exportar_excel(planilhas_exportacao(d["classificado"], d["classificado"], d["agregados"])),
+}
+
+
+def medir(funcao, repeticoes):
+    """(melhor tempo em s, pico de memória em MB); o pico vem de uma execução separada com tracemalloc."""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return melhor, pico / 2**20
+
+
+def rodar(conjuntos, casos, repeticoes):
+    resultados = {}
+    for nome, carregar in conjuntos:
+        dados = carregar()
+        for caso in casos:
+            if caso == "ler_exportacoes" and dados["exportacoes"] is None: continue
+            tempo, pico = medir(lambda: CASOS[caso](dados), repeticoes)
+            chave = f"{nome}/{caso}"
+            resultados[chave] = {"tempo_s": round(tempo, 5), "pico_mb": round(pico, 3), "voltas": len(dados["bruto"])}
+            print(f"{chave:<55} {tempo * 1000:10.1f} ms {pico:9.1f} MB", flush=True)
+    return resultados
+
+
+# Diferenças absolutas abaixo disso são ruído de medição, mesmo que a razão passe do limite.
+FOLGA_TEMPO_S, FOLGA_MEMORIA_MB = 0.01, 0.5
+
+def comparar(resultados, baseline, limite_tempo, limite_memoria):
+    """Lista de regressões: casos presentes nos dois lados que passaram de algum limite."""
+    regressoes = []
+    for chave, atual in resultados.items():
+        anterior = baseline.get(chave)
+        if not anterior: continue
+        razao_tempo = atual["tempo_s"] / max(anterior["tempo_s"], 1e-6)
+        razao_memoria = atual["pico_mb"] / max(anterior["pico_mb"], 1e-3)
+        piorou_tempo = razao_tempo > limite_tempo and atual["tempo_s"] - anterior["tempo_s"] > FOLGA_TEMPO_S
+        piorou_memoria = razao_memoria > limite_memoria and atual["pico_mb"] - anterior["pico_mb"] > FOLGA_MEMORIA_MB
+        if piorou_tempo or piorou_memoria:
+            regressoes.append((chave, razao_tempo, razao_memoria))
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0], formatter_class=argparse.RawDescriptionHelpFormatter, epilog=__doc__)
+    parser.add_argument("--escalas", type=int, nargs="*", default=[10], help="escalas sintéticas (x voltas de uma etapa média); ex.: 10 100")
+    parser.add_argument("--sem-etapas", action="store_true", help="não roda sobre as etapas salvas")
+    parser.add_argument("--casos", nargs="*", default=list(CASOS), choices=list(CASOS))
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", help="grava os resultados neste JSON")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--gravar-baseline", action="store_true", help="grava os resultados como novo baseline em vez de comparar")
+    parser.add_argument("--limite-tempo", type=float, default=1.5, help="razão atual/baseline de tempo que conta como regressão")
+    parser.add_argument("--limite-memoria", type=float, default=1.25, help="razão atual/baseline de memória que conta como regressão")
+    args = parser.parse_args()
+
+    conjuntos = [] if args.sem_etapas else list(etapas_salvas())
+    voltas_base = np.mean([len(ler_etapa_csv(os.path.join(PASTA_ETAPAS, f))) for f in os.listdir(PASTA_ETAPAS) if f.lower().endswith(".csv")])
+    conjuntos += [(f"sintetica_{k}x", lambda k=k: etapa_sintetica(k, voltas_base)) for k in args.escalas]
+
+    resultados = rodar(conjuntos, args.casos, args.repeticoes)
+    relatorio = {
+        "ambiente": {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+                     "plataforma": platform.platform(), "cpus": os.cpu_count()},
+        "resultados": resultados,
+    }
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=1)
+
+    if args.gravar_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=1)
+        print(f"\nBaseline gravado em {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"\nSem baseline em {args.baseline}; rode com --gravar-baseline.")
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["resultados"]
+    regressoes = comparar(resultados, baseline, args.limite_tempo, args.limite_memoria)
+    if regressoes:
+        print(f"\n{len(regressoes)} regressão(ões) (limites: tempo {args.limite_tempo}x, memória {args.limite_memoria}x):")
+        for chave, razao_tempo, razao_memoria in regressoes:
+            print(f"  {chave:<55} tempo {razao_tempo:5.2f}x | memória {razao_memoria:5.2f}x")
+        sys.exit(1)
+    print(f"\nSem regressões contra {args.baseline} ({sum(k in baseline for k in resultados)} casos comparados).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import pandas as pd
+
+from cronometragem.processamento import (
+    COL_CATEGORIA, COL_EVENTO, COL_PILOTO, COL_SUBCATEGORIA, COL_TT, COL_S1, COL_S2, COL_S3, COL_VEL,
+)
+
+# --- ÍNDICE DE AGREGADOS POR (CATEGORIA, EVENTO, PILOTO) ---
+CHAVES_AGREGADOS = [COL_CATEGORIA, COL_EVENTO, COL_PILOTO]
+AG_VOLTAS = "Voltas"
+AG_MELHOR_VOLTA = "Melhor Volta"
+AG_MELHOR_S1, AG_MELHOR_S2, AG_MELHOR_S3 = "Melhor S1", "Melhor S2", "Melhor S3"
+AG_VOLTA_IDEAL = "Volta Ideal"
+AG_TOP_SPEED = "Top Speed"
+# Rótulos (no índice do DataFrame da etapa) da linha da melhor volta e da de maior velocidade.
+AG_IDX_MELHOR_VOLTA = "idx_melhor_volta"
+AG_IDX_TOP_SPEED = "idx_top_speed"
+
+_MELHORES_SETORES = {COL_S1: AG_MELHOR_S1, COL_S2: AG_MELHOR_S2, COL_S3: AG_MELHOR_S3}
+
+def calcular_agregados(df):
+    """Uma linha por (categoria, evento, piloto) com melhores tempos, top speed e nº de voltas.
+
+    Tudo sai de um único `groupby`; os rótulos `AG_IDX_*` apontam para as
+    linhas de `df` que contêm a melhor volta e a maior velocidade.
+    """
+    colunas = [AG_VOLTAS, AG_MELHOR_VOLTA, AG_IDX_MELHOR_VOLTA, *_MELHORES_SETORES.values(),
+               AG_VOLTA_IDEAL, AG_TOP_SPEED, AG_IDX_TOP_SPEED, COL_SUBCATEGORIA]
+    if df.empty or not set(CHAVES_AGREGADOS) <= set(df.columns):
+        return pd.DataFrame(columns=CHAVES_AGREGADOS + colunas)
+
+    base = pd.DataFrame({c: df[c] for c in CHAVES_AGREGADOS})
+    base[AG_VOLTAS] = 1
+    base[AG_MELHOR_VOLTA] = df[COL_TT] if COL_TT in df else pd.NaT
+    for col, ag in _MELHORES_SETORES.items():
+        base[ag] = df[col] if col in df else pd.NaT
+    base[AG_TOP_SPEED] = df[COL_VEL] if COL_VEL in df else float("nan")
+    base[COL_SUBCATEGORIA] = df[COL_SUBCATEGORIA] if COL_SUBCATEGORIA in df else None
+    # Índices auxiliares só onde há valor, para o `first` depois da ordenação.
+    base[AG_IDX_MELHOR_VOLTA] = df.index.to_series().where(base[AG_MELHOR_VOLTA].notna())
+    base[AG_IDX_TOP_SPEED] = df.index.to_series().where(base[AG_TOP_SPEED].notna())
+    return _consolidar(base)
+
+def _consolidar(parciais):
+    """Reduz linhas com a mesma chave (voltas ou agregados parciais) a uma linha por chave."""
+    g = parciais.groupby(CHAVES_AGREGADOS, observed=True, sort=False)
+    resultado = g.agg(**{
+        AG_VOLTAS: (AG_VOLTAS, "sum"),
+        AG_MELHOR_VOLTA: (AG_MELHOR_VOLTA, "min"),
+        **{ag: (ag, "min") for ag in _MELHORES_SETORES.values()},
+        AG_TOP_SPEED: (AG_TOP_SPEED, "max"),
+        COL_SUBCATEGORIA: (COL_SUBCATEGORIA, "first"),
+    })
+    # Ordenação estável: empates ficam com a primeira ocorrência, como no `idxmin`.
+    melhor = parciais.sort_values(AG_MELHOR_VOLTA, kind="stable", na_position="last")
+    resultado[AG_IDX_MELHOR_VOLTA] = melhor.groupby(CHAVES_AGREGADOS, observed=True, sort=False)[AG_IDX_MELHOR_VOLTA].first()
+    rapida = parciais.sort_values(AG_TOP_SPEED, ascending=False, kind="stable", na_position="last")
+    resultado[AG_IDX_TOP_SPEED] = rapida.groupby(CHAVES_AGREGADOS, observed=True, sort=False)[AG_IDX_TOP_SPEED].first()
+    resultado[AG_VOLTA_IDEAL] = resultado[list(_MELHORES_SETORES.values())].sum(axis=1, min_count=3)
+    return resultado.reset_index()
+
+def atualizar_agregados(agregados, df_novo):
+    """Incorpora as voltas de `df_novo` (ex.: uma sessão recém-anexada) sem recalcular a etapa.
+
+    Os rótulos de `df_novo` devem ser os mesmos que as linhas terão no
+    DataFrame completo da etapa.
+    """
+    if df_novo.empty: return agregados
+    novos = calcular_agregados(df_novo)
+    if agregados.empty: return novos
+    parciais = pd.concat([agregados, novos], ignore_index=True)
+    return _consolidar(parciais.drop(columns=[AG_VOLTA_IDEAL]))
+
+def filtrar_agregados(agregados, categoria, evento, pilotos=None):
+    m = (agregados[COL_CATEGORIA] == categoria) & (agregados[COL_EVENTO] == evento)
+    if pilotos is not None:
+        m &= agregados[COL_PILOTO].isin(pilotos)
+    return agregados[m]
+
+def melhores_voltas(df, agregados):
+    """Linha completa da melhor volta de cada piloto de `agregados`, da mais rápida para a mais lenta."""
+    idx = agregados.sort_values(AG_MELHOR_VOLTA, kind="stable")[AG_IDX_MELHOR_VOLTA].dropna()
+    return df.loc[idx.astype(df.index.dtype)]
+
+def maiores_velocidades(df, agregados):
+    """Linha completa da volta de maior top speed de cada piloto, da mais rápida para a mais lenta."""
+    idx = agregados.sort_values(AG_TOP_SPEED, ascending=False, kind="stable")[AG_IDX_TOP_SPEED].dropna()
+    return df.loc[idx.astype(df.index.dtype)]
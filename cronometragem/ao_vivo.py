@@ -0,0 +1,122 @@
+import csv
+import os
+import threading
+from io import BytesIO
+
+import pandas as pd
+
+from cronometragem.agregados import atualizar_agregados, calcular_agregados
+from cronometragem.compacto import compactar_etapa
+from cronometragem.indice import construir_indice
+from cronometragem.validade import classificar_voltas
+from cronometragem.processamento import (
+    COL_PILOTO, COLS_NAO_CADASTRADOS, linhas_de_piloto, mapear_voltas, nomes_do_arquivo, preparar_etapa, relatorio_cadastro,
+)
+
+# --- MODO AO VIVO ---
+class LeitorAoVivo:
+    """Acompanha uma exportação do sistema de cronometragem que ainda está sendo escrita.
+
+    Cada chamada a `atualizar` lê só os bytes novos desde o último offset (até
+    a última linha completa), reaproveitando o cabeçalho e o piloto em vigor
+    da leitura anterior. As voltas novas passam por `preparar_etapa` e são
+    anexadas a `df` (formato compacto); `agregados` é atualizado de forma
+    incremental; `indice` (filtros da barra lateral) e a classificação das
+    voltas são refeitos, já que uma volta nova muda a das anteriores.
+    `nao_cadastrados` (nomes brutos, com número) só é refeito quando aparece
+    um piloto novo.
+
+    Um mesmo leitor pode ser compartilhado entre sessões: `atualizar` e
+    `estado` são serializados por uma trava.
+    """
+
+    def __init__(self, caminho, caminho_subcat=None, nome_exibicao=None):
+        self.caminho = caminho
+        self.caminho_subcat = caminho_subcat
+        self.categoria, self.evento = nomes_do_arquivo(nome_exibicao or caminho)
+        self._trava = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.offset = 0
+        self.colunas = None
+        self.piloto_atual = None
+        self.df = pd.DataFrame()
+        self.agregados = calcular_agregados(self.df)
+        self.indice = {}
+        self.erro = None
+        self.nao_cadastrados = pd.DataFrame(columns=COLS_NAO_CADASTRADOS)
+        self._pilotos_brutos = pd.Series(dtype=object, name=COL_PILOTO)
+
+    def _ler_bytes_novos(self):
+        tamanho = os.path.getsize(self.caminho)
+        if tamanho < self.offset:
+            # Arquivo truncado/recriado pelo sistema de cronometragem: recomeça.
+            self.reiniciar()
+        if tamanho == self.offset: return b""
+        with open(self.caminho, "rb") as f:
+            f.seek(self.offset)
+            novos = f.read(tamanho - self.offset)
+        fim = novos.rfind(b"\n") + 1
+        self.offset += fim
+        return novos[:fim]
+
+    def _separar_cabecalho(self, bloco):
+        pos = bloco.find(b"Lap Tm")
+        if pos == -1: return b""
+        inicio = bloco.rfind(b"\n", 0, pos) + 1
+        fim = bloco.find(b"\n", pos) + 1
+        linha = bloco[inicio:fim].decode("utf-8", "ignore").strip()
+        self.colunas = next(csv.reader([linha]))
+        return bloco[fim:]
+
+    def estado(self):
+        """`(df, erro, agregados, indice, nao_cadastrados)` consistentes entre si, mesmo com outra sessão atualizando."""
+        with self._trava:
+            return self.df, self.erro, self.agregados, self.indice, self.nao_cadastrados
+
+    def atualizar(self):
+        """Lê as linhas novas do arquivo; retorna quantas voltas foram anexadas."""
+        with self._trava:
+            return self._atualizar()
+
+    def _atualizar(self):
+        try:
+            bloco = self._ler_bytes_novos()
+        except OSError as e:
+            self.erro = str(e)
+            return 0
+        if self.colunas is None:
+            bloco = self._separar_cabecalho(bloco)
+            if self.colunas is None:
+                # Cabeçalho ainda não escrito: volta a procurar desde o início na próxima vez.
+                self.offset = 0
+                return 0
+        if not bloco.strip(): return 0
+
+        df_alt = pd.read_csv(BytesIO(bloco), header=None, names=self.colunas, dtype=str,
+                             sep=',', quotechar='"', encoding='utf-8', encoding_errors='ignore')
+        df_alt['Lap'] = pd.to_numeric(df_alt['Lap'], errors='coerce')
+        novos = mapear_voltas(df_alt, self.categoria, self.evento, piloto_anterior=self.piloto_atual)
+
+        col_hora = next(c for c in df_alt.columns if "Time" in c)
+        pilotos_vistos = df_alt[col_hora].where(linhas_de_piloto(df_alt, col_hora)).dropna()
+        if not pilotos_vistos.empty:
+            self.piloto_atual = pilotos_vistos.iloc[-1]
+        if novos.empty: return 0
+
+        pilotos_novos = novos[COL_PILOTO].drop_duplicates()
+        pilotos_novos = pilotos_novos[~pilotos_novos.isin(self._pilotos_brutos)]
+        novos, self.erro = preparar_etapa(novos, self.caminho_subcat)
+        if not pilotos_novos.empty:
+            self._pilotos_brutos = pd.concat([self._pilotos_brutos, pilotos_novos], ignore_index=True)
+            if not self.erro:
+                self.nao_cadastrados = relatorio_cadastro(self._pilotos_brutos.to_frame(), self.caminho_subcat)
+        novos.index = pd.RangeIndex(len(self.df), len(self.df) + len(novos))
+        self.agregados = atualizar_agregados(self.agregados, novos)
+        # Categorias diferentes entre os blocos viram texto no concat; compactar refaz as categorias.
+        novos = compactar_etapa(novos)
+        self.df = compactar_etapa(pd.concat([self.df, novos])) if not self.df.empty else novos
+        self.df = classificar_voltas(self.df)
+        self.indice = construir_indice(self.df)
+        return len(novos)
@@ -0,0 +1,124 @@
+import hashlib
+import logging
+import os
+from functools import lru_cache
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from cronometragem.perfil import etapa
+from cronometragem.processamento import (
+    COL_CATEGORIA, COL_EVENTO, COL_PILOTO, normalizar_tipos_dados, preparar_etapa, relatorio_cadastro,
+)
+from cronometragem.validade import classificar_voltas
+
+# Cópias tipadas (Parquet) das etapas ficam numa subpasta da própria pasta de etapas.
+PASTA_TIPADAS = ".tipadas"
+COLS_CATEGORICAS = [COL_CATEGORIA, COL_EVENTO, COL_PILOTO]
+_CHAVE_MTIME = b"mtime_origem"
+# A cópia tipada só acelera a leitura: falhas ao gravá-la ou lê-la caem no CSV.
+ERROS_TIPADO = (OSError, pa.ArrowException)
+_logger = logging.getLogger("cronometragem.armazenamento")
+
+def ler_etapa_csv(caminho_csv):
+    return pd.read_csv(caminho_csv, sep=';', encoding='utf-8-sig', low_memory=False)
+
+def caminho_tipado(caminho_csv):
+    pasta, nome = os.path.split(caminho_csv)
+    return os.path.join(pasta, PASTA_TIPADAS, os.path.splitext(nome)[0] + ".parquet")
+
+def tipar_etapa(df):
+    """Converte uma etapa crua (strings do CSV) para os tipos usados na análise."""
+    df = normalizar_tipos_dados(df.copy())
+    for c in COLS_CATEGORICAS:
+        if c in df.columns:
+            df[c] = df[c].astype("category")
+    return df
+
+def salvar_tipado(df, caminho_csv):
+    """Grava a cópia Parquet de uma etapa já tipada, marcada com o mtime do CSV de origem."""
+    destino = caminho_tipado(caminho_csv)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    mtime = str(os.path.getmtime(caminho_csv)).encode()
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    tabela = tabela.replace_schema_metadata({**(tabela.schema.metadata or {}), _CHAVE_MTIME: mtime})
+    tmp = destino + ".tmp"
+    pq.write_table(tabela, tmp)
+    os.replace(tmp, destino)
+    return destino
+
+def tipado_atualizado(caminho_csv):
+    destino = caminho_tipado(caminho_csv)
+    if not os.path.exists(destino): return False
+    try:
+        metadata = pq.read_schema(destino).metadata or {}
+    except Exception:
+        return False
+    return metadata.get(_CHAVE_MTIME) == str(os.path.getmtime(caminho_csv)).encode()
+
+def salvar_etapa(df_bruto, caminho_csv):
+    """Salva a etapa consolidada em CSV e grava junto a cópia tipada.
+
+    Retorna `None` ou, se só a cópia tipada falhou (o CSV fica salvo), a mensagem do erro.
+    """
+    df_bruto.to_csv(caminho_csv, sep=';', index=False, encoding='utf-8-sig')
+    try:
+        salvar_tipado(tipar_etapa(df_bruto), caminho_csv)
+    except ERROS_TIPADO as e:
+        _logger.warning(f"Cópia tipada de '{caminho_csv}' não gravada: {e}")
+        return str(e) or type(e).__name__
+    return None
+
+def carregar_etapa(caminho_csv):
+    """Carrega uma etapa salva já tipada.
+
+    Usa a cópia Parquet quando ela corresponde ao mtime atual do CSV; caso
+    contrário lê o CSV, converte os tipos e regrava a cópia.
+    """
+    if tipado_atualizado(caminho_csv):
+        try:
+            return pd.read_parquet(caminho_tipado(caminho_csv))
+        except ERROS_TIPADO as e:
+            _logger.warning(f"Cópia tipada de '{caminho_csv}' ilegível, lendo o CSV: {e}")
+    df = tipar_etapa(ler_etapa_csv(caminho_csv))
+    try:
+        salvar_tipado(df, caminho_csv)
+    except ERROS_TIPADO as e:
+        _logger.warning(f"Cópia tipada de '{caminho_csv}' não gravada: {e}")
+    return df
+
+@lru_cache(maxsize=64)
+def _hash_arquivo(caminho, mtime_ns, tamanho):
+    h = hashlib.sha1()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+def assinatura_arquivo(caminho):
+    """(caminho, mtime, hash) do arquivo, ou `None` se ele não existir.
+
+    O hash só é recalculado quando mtime ou tamanho mudam.
+    """
+    if not caminho or not os.path.exists(caminho): return None
+    info = os.stat(caminho)
+    return (os.path.abspath(caminho), info.st_mtime_ns, _hash_arquivo(caminho, info.st_mtime_ns, info.st_size))
+
+def carregar_etapa_enriquecida(caminho_etapa, caminho_subcat):
+    """Pipeline completo de uma etapa salva: leitura tipada + `preparar_etapa` + `classificar_voltas`.
+
+    Função pura (não depende do Streamlit), pensada para ser memoizada pela
+    assinatura dos dois arquivos. Retorna `(df, erro, nao_cadastrados)`: os
+    dois primeiros como `preparar_etapa`, o último com `relatorio_cadastro`
+    dos nomes brutos (vazio se o cadastro não pôde ser aplicado).
+    """
+    with etapa("Leitura") as span:
+        bruto = carregar_etapa(caminho_etapa)
+        span["linhas"] = len(bruto)
+    df, erro = preparar_etapa(bruto, caminho_subcat)
+    with etapa("Pilotos sem cadastro"):
+        nao_cadastrados = relatorio_cadastro(bruto if not erro else bruto.iloc[:0], caminho_subcat)
+    with etapa("Classificação das voltas", len(df)):
+        df = classificar_voltas(df)
+    return df, erro, nao_cadastrados
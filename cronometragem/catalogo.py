@@ -0,0 +1,100 @@
+import json
+import logging
+import os
+import re
+
+import pandas as pd
+
+from cronometragem.processamento import COL_CATEGORIA, COL_EVENTO
+
+# --- CATÁLOGO DE ETAPAS ---
+# Pista, ano e número vêm do nome do arquivo ("25ET1 - VELOCITTA.csv"); linhas
+# e sessões, de uma leitura só das colunas de categoria/evento. Fica em
+# <pasta das etapas>/.catalogo.json e só as entradas cujo arquivo mudou
+# (mtime/tamanho) são refeitas.
+ARQUIVO_CATALOGO = ".catalogo.json"
+_PAT_ETAPA = re.compile(r'^\s*(?P<ano>\d{2})?\s*(?P<codigo>ET\w+?)\s*-\s*(?P<pista>.+?)\s*$', re.IGNORECASE)
+MAPEAMENTO_PISTAS = {
+    "ET1": "Velocitta.png", "ET2": "Velocitta.png", "ETX": "Velocitta.png", "ET51": "Velocitta.png",
+    "ET3": "Interlagos.png", "ET8": "Interlagos.png", "ET9": "Interlagos.png",
+    "ET4": "Algarve.png", "ET5": "Algarve.png",
+    "ET6": "Estoril.png", "ET7": "Estoril.png",
+}
+_logger = logging.getLogger("cronometragem.catalogo")
+
+def identificar_etapa(arquivo):
+    """`(ano, codigo, pista)` a partir do nome do arquivo; campos não reconhecidos ficam `None`."""
+    m = _PAT_ETAPA.match(os.path.splitext(os.path.basename(arquivo))[0])
+    if not m: return None, None, None
+    ano = 2000 + int(m["ano"]) if m["ano"] else None
+    return ano, m["codigo"].upper(), m["pista"].strip().title()
+
+def mapa_da_etapa(arquivo, mapas_disponiveis):
+    """Imagem da pista em `mapas_disponiveis`.
+
+    Pelo código da etapa: o do formato "25ET1 - PISTA" ou, fora dele, um
+    código conhecido em qualquer ponto do nome ("Etapa_ET3_final.csv"); sem
+    código, pelo nome da pista no arquivo.
+    """
+    _, codigo, pista = identificar_etapa(arquivo)
+    mapa = MAPEAMENTO_PISTAS.get(codigo)
+    if mapa in mapas_disponiveis: return mapa
+    nome = os.path.basename(arquivo).upper()
+    # Códigos mais longos primeiro: "ET51" não pode cair no mapa de "ET5".
+    mapa = next((MAPEAMENTO_PISTAS[c] for c in sorted(MAPEAMENTO_PISTAS, key=len, reverse=True) if c in nome), None)
+    if mapa in mapas_disponiveis: return mapa
+    nome = (pista or nome).upper()
+    return next((m for m in sorted(mapas_disponiveis) if os.path.splitext(m)[0].upper() in nome), None)
+
+def assinatura_pasta(pasta, extensao=""):
+    """`(nome, mtime_ns, tamanho)` de cada arquivo de `pasta` (com a `extensao`), para usar como chave de cache."""
+    if not os.path.isdir(pasta): return ()
+    with os.scandir(pasta) as entradas:
+        arquivos = [(e.name, e.stat()) for e in entradas if e.name.lower().endswith(extensao) and e.is_file()]
+    return tuple(sorted((nome, info.st_mtime_ns, info.st_size) for nome, info in arquivos))
+
+def _descrever_etapa(caminho):
+    sessoes = pd.read_csv(caminho, sep=';', encoding='utf-8-sig', usecols=lambda c: c in (COL_CATEGORIA, COL_EVENTO), dtype=str)
+    ano, codigo, pista = identificar_etapa(caminho)
+    return {
+        "ano": ano, "numero": codigo[2:] if codigo else None, "pista": pista, "linhas": len(sessoes),
+        "sessoes": len(sessoes.drop_duplicates()) if not sessoes.empty else 0,
+    }
+
+def atualizar_catalogo(pasta_etapas, pasta_mapas=None):
+    """Catálogo das etapas salvas (um DataFrame, uma linha por CSV), refazendo só as entradas de arquivos alterados."""
+    caminho_catalogo = os.path.join(pasta_etapas, ARQUIVO_CATALOGO)
+    try:
+        with open(caminho_catalogo, encoding="utf-8") as f:
+            antigo = json.load(f)
+    except (OSError, ValueError):
+        antigo = {}
+
+    catalogo = {}
+    with os.scandir(pasta_etapas) as entradas:
+        for entrada in sorted((e for e in entradas if e.name.lower().endswith(".csv") and e.is_file()), key=lambda e: e.name):
+            info = entrada.stat()
+            assinatura = [info.st_mtime_ns, info.st_size]
+            registro = antigo.get(entrada.name)
+            if not registro or registro.get("assinatura") != assinatura:
+                try:
+                    registro = {"assinatura": assinatura, **_descrever_etapa(entrada.path)}
+                except (OSError, ValueError) as e:
+                    registro = {"assinatura": assinatura, "erro": str(e)}
+            catalogo[entrada.name] = registro
+
+    if catalogo != antigo:
+        tmp = caminho_catalogo + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(catalogo, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, caminho_catalogo)
+        except OSError as e:
+            # Sem gravar, o catálogo desta chamada vale igual; a próxima refaz as entradas.
+            _logger.warning(f"Catálogo '{caminho_catalogo}' não gravado: {e}")
+
+    mapas = set(os.listdir(pasta_mapas)) if pasta_mapas and os.path.isdir(pasta_mapas) else set()
+    linhas = [{"Arquivo": arquivo, "Pista": r.get("pista"), "Ano": r.get("ano"), "Etapa": r.get("numero"),
+               "Linhas": r.get("linhas"), "Sessões": r.get("sessoes"), "Mapa": mapa_da_etapa(arquivo, mapas)}
+              for arquivo, r in catalogo.items()]
+    return pd.DataFrame(linhas, columns=["Arquivo", "Pista", "Ano", "Etapa", "Linhas", "Sessões", "Mapa"])
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+from cronometragem.processamento import (
+    COL_CATEGORIA, COL_EVENTO, COL_HORARIO, COL_PILOTO, COL_SUBCATEGORIA, COL_VEL, COL_VOLTA, COLS_TEMPO,
+)
+
+# --- ETAPA COMPACTA ---
+# Mesmas colunas da etapa padrão, com tipos menores: categorias para os textos
+# repetidos, milissegundos (Int32) para tempos e horário do dia, Int16 para a
+# volta e float32 para a velocidade. É o formato guardado em cache; as abas
+# trabalham com `expandir_etapa`, que devolve os tipos de sempre.
+COLS_CATEGORICAS_ETAPA = [COL_CATEGORIA, COL_EVENTO, COL_SUBCATEGORIA, COL_PILOTO]
+_COLS_TEXTO = [COL_SUBCATEGORIA, COL_PILOTO]
+_MS_POR_HORA, _MS_POR_MINUTO = 3_600_000, 60_000
+_PAT_HORARIO = r'\d{1,2}:\d{2}:\d{2}(?:\.\d{1,3})?'
+
+def horario_para_ms(serie):
+    """"H:MM:SS.mmm" -> milissegundos desde a meia-noite (Int32); formatos desconhecidos viram NA."""
+    texto = serie.astype("str")
+    validos = texto.str.fullmatch(_PAT_HORARIO).fillna(False).astype(bool)
+    resultado = pd.Series(pd.NA, index=serie.index, dtype="Int32")
+    if not validos.any(): return resultado
+
+    # Completa para "HH:MM:SS.mmm" e lê os dígitos como um inteiro HHMMSSmmm.
+    t = texto[validos]
+    t = t.where(t.str.find(":") != 1, "0" + t)
+    t = t.where(t.str.contains(".", regex=False), t + ".").str.ljust(12, "0")
+    n = t.str.replace(":", "", regex=False).str.replace(".", "", regex=False).astype(np.int64).to_numpy()
+    ms = n // 10**7 * _MS_POR_HORA + n // 10**5 % 100 * _MS_POR_MINUTO + n // 1000 % 100 * 1000 + n % 1000
+    resultado[validos] = ms
+    return resultado
+
+def ms_para_horario(serie):
+    ms = serie.to_numpy("int64", na_value=0)
+    # Inteiro HMMSSmmm -> texto (mínimo de 8 dígitos) cortado por posição a partir da direita.
+    n = ms // _MS_POR_HORA * 10**7 + ms % _MS_POR_HORA // _MS_POR_MINUTO * 10**5 + ms % _MS_POR_MINUTO
+    t = pd.Series(n, index=serie.index).astype("str").str.pad(8, fillchar="0")
+    texto = t.str.slice(0, -7) + ":" + t.str.slice(-7, -5) + ":" + t.str.slice(-5, -3) + "." + t.str.slice(-3)
+    return texto.where(serie.notna().to_numpy())
+
+def tempos_em_ms(serie):
+    """Tempos (timedelta da etapa padrão ou Int32 da compacta) como float em ms, com NaN nos vazios."""
+    if serie.dtype.kind == "m":
+        return serie.dt.total_seconds().to_numpy(float, na_value=np.nan) * 1000
+    return serie.astype("float64").to_numpy(na_value=np.nan)
+
+def horario_em_ms(serie):
+    """Horário (texto da etapa padrão ou Int32 da compacta) como float em ms, com NaN nos vazios."""
+    if not pd.api.types.is_integer_dtype(serie):
+        serie = horario_para_ms(serie)
+    return serie.astype("float64").to_numpy(na_value=np.nan)
+
+def compactar_etapa(df):
+    """Versão compacta de uma etapa padrão (ou já compacta)."""
+    df = df.copy()
+    for c in COLS_CATEGORICAS_ETAPA:
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
+    for c in COLS_TEMPO:
+        if c in df.columns and df[c].dtype.kind == "m":
+            df[c] = (df[c].astype("int64") // 10**6).where(df[c].notna()).astype("Int32")
+    if COL_HORARIO in df.columns and not pd.api.types.is_integer_dtype(df[COL_HORARIO]):
+        df[COL_HORARIO] = horario_para_ms(df[COL_HORARIO])
+    if COL_VOLTA in df.columns and df[COL_VOLTA].dtype != "Int16":
+        df[COL_VOLTA] = df[COL_VOLTA].round().astype("Int16")
+    if COL_VEL in df.columns:
+        df[COL_VEL] = df[COL_VEL].astype(np.float32)
+    return df
+
+def expandir_etapa(df):
+    """Visão padrão de uma etapa compacta: timedelta, float64, horário em texto e pilotos/subcategorias como texto."""
+    df = df.copy()
+    for c in COLS_TEMPO:
+        if c in df.columns and df[c].dtype.kind != "m":
+            df[c] = pd.to_timedelta(df[c].astype("float64"), unit="ms").astype("timedelta64[ns]")
+    if COL_HORARIO in df.columns and pd.api.types.is_integer_dtype(df[COL_HORARIO]):
+        df[COL_HORARIO] = ms_para_horario(df[COL_HORARIO])
+    if COL_VOLTA in df.columns:
+        df[COL_VOLTA] = df[COL_VOLTA].astype("float64")
+    if COL_VEL in df.columns and df[COL_VEL].dtype == np.float32:
+        # float32 guarda ~7 dígitos; as velocidades vêm com 3 casas decimais.
+        df[COL_VEL] = df[COL_VEL].astype("float64").round(3)
+    for c in _COLS_TEXTO:
+        if c in df.columns and isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("str")
+    return df
+
+def relatorio_memoria(etapas):
+    """Memória (MB) de cada etapa `{nome: df}` no formato padrão e no compacto."""
+    linhas = []
+    for nome, df in etapas.items():
+        padrao = expandir_etapa(df).memory_usage(deep=True).sum() / 2**20
+        compacta = compactar_etapa(df).memory_usage(deep=True).sum() / 2**20
+        linhas.append({"Etapa": nome, "Voltas": len(df), "Padrão (MB)": round(padrao, 3),
+                       "Compacta (MB)": round(compacta, 3), "Redução": f"{padrao / compacta:.1f}x"})
+    return pd.DataFrame(linhas)
@@ -0,0 +1,94 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# --- CACHE COMPARTILHADO DE ETAPAS ---
+# Uma instância por processo (no app, via `st.cache_resource`): todas as sessões
+# recebem o mesmo objeto de cada etapa, sem cópia. Os valores são somente
+# leitura: as abas trabalham em fatias (`take`, filtros), que com o
+# copy-on-write do pandas nunca alteram o original.
+ORCAMENTO_MB_PADRAO = 512
+
+def tamanho_mb(valor):
+    """Estimativa da memória ocupada por `valor` (DataFrames, arrays e contêineres deles), em MB."""
+    vistos = set()
+    def medir(v):
+        if id(v) in vistos: return 0
+        vistos.add(id(v))
+        if isinstance(v, pd.DataFrame): return int(v.memory_usage(index=True, deep=True).sum())
+        if isinstance(v, (pd.Series, pd.Index)): return int(v.memory_usage(deep=True))
+        if isinstance(v, np.ndarray): return v.nbytes
+        if isinstance(v, dict): return sys.getsizeof(v) + sum(medir(k) + medir(x) for k, x in v.items())
+        if isinstance(v, (list, tuple)): return sys.getsizeof(v) + sum(medir(x) for x in v)
+        return sys.getsizeof(v)
+    return medir(valor) / 2**20
+
+def _somente_leitura(valor):
+    """Marca os arrays NumPy de `valor` (ex.: posições do índice de filtros) como não graváveis."""
+    if isinstance(valor, np.ndarray):
+        valor.flags.writeable = False
+    elif isinstance(valor, dict):
+        for v in valor.values(): _somente_leitura(v)
+    elif isinstance(valor, (list, tuple)):
+        for v in valor: _somente_leitura(v)
+
+class CacheEtapas:
+    """LRU de etapas prontas, seguro entre threads, limitado por `orcamento_mb`.
+
+    `obter(chave, montar)` devolve o valor em cache ou chama `montar()`; se
+    várias sessões pedem a mesma etapa ao mesmo tempo, só uma monta e as outras
+    esperam por ela. Passando do orçamento, as etapas usadas há mais tempo saem
+    do cache (a recém-montada fica sempre); sessões que ainda as usam mantêm a
+    referência até o fim da execução.
+    """
+
+    def __init__(self, orcamento_mb=ORCAMENTO_MB_PADRAO):
+        self.orcamento_mb = orcamento_mb
+        self._entradas = OrderedDict()
+        self._montando = {}
+        self._trava = threading.Lock()
+        self.acertos = self.faltas = self.despejos = 0
+
+    def _acerto(self, chave):
+        self._entradas.move_to_end(chave)
+        self.acertos += 1
+        return self._entradas[chave][0]
+
+    def obter(self, chave, montar):
+        with self._trava:
+            if chave in self._entradas: return self._acerto(chave)
+            trava_chave = self._montando.setdefault(chave, threading.Lock())
+        with trava_chave:
+            with self._trava:
+                if chave in self._entradas: return self._acerto(chave)
+            try:
+                valor = montar()
+            except BaseException:
+                with self._trava:
+                    self._montando.pop(chave, None)
+                raise
+            _somente_leitura(valor)
+            mb = tamanho_mb(valor)
+            with self._trava:
+                self._montando.pop(chave, None)
+                self._entradas[chave] = (valor, mb)
+                self.faltas += 1
+                while len(self._entradas) > 1 and self.memoria_mb() > self.orcamento_mb:
+                    self._entradas.popitem(last=False)
+                    self.despejos += 1
+        return valor
+
+    def memoria_mb(self):
+        return sum(mb for _, mb in self._entradas.values())
+
+    def limpar(self):
+        with self._trava:
+            self._entradas.clear()
+
+    def estatisticas(self):
+        with self._trava:
+            return {"etapas": len(self._entradas), "memoria_mb": round(self.memoria_mb(), 1), "orcamento_mb": self.orcamento_mb,
+                    "acertos": self.acertos, "faltas": self.faltas, "despejos": self.despejos}
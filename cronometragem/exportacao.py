@@ -0,0 +1,94 @@
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from cronometragem.agregados import (
+    AG_IDX_MELHOR_VOLTA, AG_IDX_TOP_SPEED, maiores_velocidades, melhores_voltas,
+)
+from cronometragem.processamento import COLS_TEMPO
+from cronometragem.tabelas import fmt_tempo_coluna
+
+# Duração nativa do Excel: minutos acumulados, segundos e milésimos.
+FORMATO_DURACAO = '[m]:ss.000'
+TAMANHO_BLOCO = 5000
+_NS_POR_DIA = 86_400 * 10**9
+
+def planilhas_exportacao(df_final, df_base, agregados):
+    """Abas do Excel exportado: voltas filtradas, melhores voltas, top speeds e resumo por piloto."""
+    resumo = agregados.drop(columns=[AG_IDX_MELHOR_VOLTA, AG_IDX_TOP_SPEED], errors='ignore')
+    return {
+        "Dados Filtrados": df_final,
+        "Melhores Voltas": melhores_voltas(df_base, agregados),
+        "Top Speeds": maiores_velocidades(df_base, agregados),
+        "Resumo por Piloto": resumo,
+    }
+
+def _valores_celula(serie):
+    """Valores prontos para o xlsxwriter: durações em dias, números como float, booleanos como bool e `None` para vazios."""
+    vazios = serie.isna().to_numpy()
+    if pd.api.types.is_bool_dtype(serie):
+        valores = serie.to_numpy(bool, na_value=False)
+    elif serie.dtype.kind == "m":
+        valores = serie.to_numpy("timedelta64[ns]").astype(np.int64) / _NS_POR_DIA
+    elif pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        valores = serie.to_numpy(float, na_value=np.nan)
+    else:
+        valores = serie.astype(str).to_numpy(object)
+    valores = valores.astype(object)
+    valores[vazios] = None
+    return valores.tolist()
+
+def _escrever_aba(workbook, nome, df, formato_cabecalho, formato_duracao):
+    ws = workbook.add_worksheet(nome[:31])
+    colunas = list(df.columns)
+    formatos = [formato_duracao if df[c].dtype.kind == "m" else None for c in colunas]
+    def escritor(serie):
+        if pd.api.types.is_bool_dtype(serie): return ws.write_boolean
+        if serie.dtype.kind == "m" or pd.api.types.is_numeric_dtype(serie): return ws.write_number
+        return ws.write_string
+    escritores = [escritor(df[c]) for c in colunas]
+    ws.write_row(0, 0, [str(c) for c in colunas], formato_cabecalho)
+    for j, fmt in enumerate(formatos):
+        if fmt is not None: ws.set_column(j, j, 12)
+
+    # Em `constant_memory` as linhas precisam sair em ordem; cada bloco é
+    # convertido coluna a coluna e escrito linha a linha.
+    linha = 1
+    for inicio in range(0, len(df), TAMANHO_BLOCO):
+        bloco = df.iloc[inicio:inicio + TAMANHO_BLOCO]
+        for valores in zip(*(_valores_celula(bloco[c]) for c in colunas)):
+            for j, valor in enumerate(valores):
+                if valor is not None:
+                    escritores[j](linha, j, valor, formatos[j])
+            linha += 1
+
+def exportar_excel(planilhas):
+    """xlsx com uma aba por item de `planilhas`, gravado em modo `constant_memory`."""
+    import xlsxwriter  # só quando a exportação em Excel é pedida
+    buf = BytesIO()
+    workbook = xlsxwriter.Workbook(buf, {'constant_memory': True, 'nan_inf_to_errors': True})
+    formato_cabecalho = workbook.add_format({'bold': True})
+    formato_duracao = workbook.add_format({'num_format': FORMATO_DURACAO})
+    for nome, df in planilhas.items():
+        _escrever_aba(workbook, nome, df, formato_cabecalho, formato_duracao)
+    workbook.close()
+    return buf.getvalue()
+
+def exportar_csv(df):
+    """CSV (`;`, utf-8-sig) com os tempos no formato "M:SS.mmm", escrito em blocos."""
+    buf = BytesIO()
+    for inicio in range(0, len(df), TAMANHO_BLOCO):
+        bloco = df.iloc[inicio:inicio + TAMANHO_BLOCO].copy()
+        for c in COLS_TEMPO:
+            if c in bloco.columns: bloco[c] = fmt_tempo_coluna(bloco[c])
+        buf.write(bloco.to_csv(sep=';', index=False, header=(inicio == 0)).encode('utf-8-sig' if inicio == 0 else 'utf-8'))
+    if len(df) == 0:
+        buf.write(df.to_csv(sep=';', index=False).encode('utf-8-sig'))
+    return buf.getvalue()
+
+def exportar_parquet(df):
+    """Parquet com os tipos originais (durações, floats e categorias)."""
+    buf = BytesIO()
+    df.to_parquet(buf, index=False)
+    return buf.getvalue()
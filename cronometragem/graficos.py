@@ -0,0 +1,60 @@
+from io import BytesIO
+
+from cronometragem.processamento import COL_VOLTA
+
+# O matplotlib só é importado ao renderizar o primeiro gráfico (~0,7 s de importação).
+
+def series_por_grupo(dados, col_grupo, col_valor, grupos, ordenar=True):
+    """Separa `dados` em {grupo: (voltas, valores)} com um único `groupby`.
+
+    Tempos (timedelta) viram segundos; linhas sem valor são descartadas. Com
+    `ordenar=True` cada série fica em ordem de volta.
+    """
+    dados = dados[dados[col_valor].notna()]
+    if ordenar:
+        dados = dados.sort_values(COL_VOLTA, kind="stable")
+    valores = dados[col_valor]
+    if valores.dtype.kind == "m":
+        valores = valores.dt.total_seconds()
+    series = {}
+    for grupo, idx in dados.groupby(col_grupo, observed=True, sort=False).indices.items():
+        series[grupo] = (dados[COL_VOLTA].to_numpy()[idx], valores.to_numpy()[idx])
+    return {g: series[g] for g in grupos if g in series}
+
+def _fmt_eixo_tempo(so_positivos):
+    import matplotlib.ticker as mticker
+    if so_positivos:
+        return mticker.FuncFormatter(lambda s, pos: f'{int(s // 60)}:{int(s % 60):02d}' if s > 0 else '')
+    return mticker.FuncFormatter(lambda s, pos: f'{int(s // 60)}:{int(s % 60):02d}')
+
+def grafico_png(series, tempo, ylabel, titulo=None, referencia=None, marker='o', linestyle='-', figsize=(10, 5)):
+    """Renderiza as séries em PNG e libera a figura.
+
+    Sem `titulo` usa o estilo da aba Gráficos; com `titulo` usa o estilo dos
+    comparativos, destacando a série `referencia`.
+    """
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    comparativo = titulo is not None
+    for rotulo, (x, y) in series.items():
+        if not comparativo:
+            ax.plot(x, y, marker=marker, linestyle=linestyle, label=rotulo)
+            continue
+        is_ref = referencia is not None and rotulo == referencia
+        ax.plot(x, y, marker='o', markersize=7 if is_ref else 5, linewidth=3 if is_ref else 1.5, linestyle='-' if is_ref else '--',
+                label=f"{rotulo} (Ref.)" if is_ref else rotulo, zorder=10 if is_ref else 5)
+
+    ax.set_xlabel("Volta"); ax.set_ylabel(ylabel)
+    if tempo:
+        ax.yaxis.set_major_formatter(_fmt_eixo_tempo(comparativo))
+    if comparativo:
+        ax.set_title(titulo); ax.legend(fontsize='small'); ax.grid(True, which='both', linestyle='--', linewidth=0.5)
+    else:
+        ax.grid(True, linestyle='--', alpha=0.6); ax.legend()
+
+    buf = BytesIO()
+    fig.savefig(buf, format="png", dpi=200, bbox_inches="tight")
+    fig.clear()
+    del fig
+    return buf.getvalue()
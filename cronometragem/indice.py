@@ -0,0 +1,48 @@
+import numpy as np
+
+from cronometragem.processamento import COL_CATEGORIA, COL_EVENTO, COL_PILOTO, COL_SUBCATEGORIA
+
+# --- ÍNDICE DOS FILTROS ---
+# categoria → evento → subcategoria → piloto → posições (ordenadas) das linhas.
+# Montado uma vez por etapa; os filtros da barra lateral só percorrem as chaves
+# e juntam os arrays de posições, sem varrer o DataFrame.
+NIVEIS_FILTRO = [COL_CATEGORIA, COL_EVENTO, COL_SUBCATEGORIA, COL_PILOTO]
+
+def construir_indice(df):
+    """Índice hierárquico dos filtros de `df`; linhas com algum nível vazio ficam de fora, como no filtro por igualdade."""
+    indice = {}
+    if df.empty or not set(NIVEIS_FILTRO) <= set(df.columns): return indice
+    # Um código por grupo (-1 para linhas com nível vazio); ordenar as posições
+    # pelo código (estável) deixa cada grupo contíguo e com as posições em ordem.
+    grupos = df.groupby(NIVEIS_FILTRO, observed=True, sort=False).ngroup().to_numpy()
+    validas = np.flatnonzero(grupos >= 0)
+    ordem = validas[np.argsort(grupos[validas], kind="stable")]
+    inicios = np.flatnonzero(np.r_[True, np.diff(grupos[ordem]) != 0]) if len(ordem) else np.empty(0, dtype=np.intp)
+    chaves = zip(*(df[c].to_numpy()[ordem[inicios]] for c in NIVEIS_FILTRO))
+    for (cat, ev, sub, piloto), pos in zip(chaves, np.split(ordem, inicios[1:])):
+        indice.setdefault(cat, {}).setdefault(ev, {}).setdefault(sub, {})[piloto] = pos
+    return indice
+
+def _nos(indice, selecao):
+    nos = [indice]
+    for valor in selecao:
+        if valor is None:
+            nos = [filho for no in nos for filho in no.values()]
+        else:
+            chaves = valor if isinstance(valor, (list, tuple, set)) else [valor]
+            nos = [no[k] for no in nos for k in chaves if k in no]
+    return nos
+
+def opcoes_filtro(indice, *selecao):
+    """Opções (ordenadas) do nível seguinte à `selecao`.
+
+    Cada nível da seleção pode ser um valor, uma lista de valores ou `None`
+    (todos). Ex.: `opcoes_filtro(indice, cat, ev)` lista as subcategorias.
+    """
+    return sorted({k for no in _nos(indice, selecao) for k in no})
+
+def linhas_filtro(indice, *selecao):
+    """Posições ordenadas das linhas que atendem à `selecao` (mesma convenção de `opcoes_filtro`); níveis omitidos valem todos."""
+    nos = _nos(indice, list(selecao) + [None] * (len(NIVEIS_FILTRO) - len(selecao)))
+    if not nos: return np.empty(0, dtype=np.intp)
+    return np.sort(np.concatenate(nos))
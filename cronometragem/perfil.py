@@ -0,0 +1,135 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# --- PERFIL DE EXECUÇÃO ---
+# Cada execução do script pode ativar um `Perfil`; as fases instrumentadas com
+# `etapa(...)` (no app e dentro do pacote) viram spans com duração, linhas e
+# variação de memória. Sem perfil ativo, `etapa` devolve um contexto vazio.
+PASTA_LOGS = "logs"
+ARQUIVO_LOG = "perfil.log"
+TAMANHO_LOG = 1_000_000
+BACKUPS_LOG = 3
+LINHAS_CPROFILE = 40
+
+_PERFIL_ATUAL = ContextVar("perfil_atual", default=None)
+_NULO = nullcontext({})
+_logger = logging.getLogger("cronometragem.perfil")
+
+def memoria_mb():
+    """Memória residente do processo em MB (psutil ou /proc); `None` se não houver como medir."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2**20
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class Perfil:
+    """Spans de uma execução: fase, duração, linhas e variação de memória."""
+
+    def __init__(self, rotulo=""):
+        self.rotulo = rotulo
+        self.spans = []
+        self._nivel = 0
+
+    @contextmanager
+    def medir(self, nome, linhas=None):
+        span = {"etapa": nome, "nivel": self._nivel, "linhas": linhas}
+        self.spans.append(span)
+        self._nivel += 1
+        memoria = memoria_mb()
+        inicio = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span["ms"] = (time.perf_counter() - inicio) * 1000
+            depois = memoria_mb()
+            span["memoria_mb"] = depois - memoria if memoria is not None and depois is not None else None
+            self._nivel -= 1
+
+    def tabela(self):
+        linhas = [{"Etapa": "  " * s["nivel"] + s["etapa"], "ms": round(s.get("ms", float("nan")), 1),
+                   "Linhas": s["linhas"], "Δ Memória (MB)": None if s.get("memoria_mb") is None else round(s["memoria_mb"], 1)}
+                  for s in self.spans]
+        return pd.DataFrame(linhas, columns=["Etapa", "ms", "Linhas", "Δ Memória (MB)"])
+
+    def registrar(self):
+        """Grava os spans no log rotativo (`logs/perfil.log`)."""
+        configurar_log()
+        for s in self.spans:
+            memoria = "" if s.get("memoria_mb") is None else f" | {s['memoria_mb']:+.1f} MB"
+            linhas = "" if s["linhas"] is None else f" | {s['linhas']} linhas"
+            _logger.info(f"{self.rotulo} | {'  ' * s['nivel']}{s['etapa']} | {s.get('ms', 0):.1f} ms{linhas}{memoria}")
+
+def ativar_perfil(ativo, rotulo=""):
+    """Define o perfil da execução atual (ou nenhum, com `ativo=False`) e o retorna."""
+    perfil = Perfil(rotulo) if ativo else None
+    _PERFIL_ATUAL.set(perfil)
+    return perfil
+
+def etapa(nome, linhas=None):
+    """Span `nome` no perfil ativo. Uso: `with etapa("Filtros") as s: ...; s["linhas"] = len(df)`."""
+    perfil = _PERFIL_ATUAL.get()
+    return _NULO if perfil is None else perfil.medir(nome, linhas)
+
+def medido(nome, funcao, linhas=None):
+    """`funcao` medida num span próprio, gravado direto no log.
+
+    Para chamadas adiadas, como o `data=` do `st.download_button`, que rodam
+    depois que a execução (e o perfil dela) já terminou. Sem perfil ativo,
+    devolve `funcao` sem alteração.
+    """
+    perfil = _PERFIL_ATUAL.get()
+    if perfil is None: return funcao
+    def medir(*args, **kwargs):
+        avulso = Perfil(perfil.rotulo)
+        with avulso.medir(nome, linhas):
+            resultado = funcao(*args, **kwargs)
+        avulso.registrar()
+        return resultado
+    return medir
+
+def configurar_log(pasta=PASTA_LOGS):
+    if any(isinstance(h, RotatingFileHandler) for h in _logger.handlers): return
+    os.makedirs(pasta, exist_ok=True)
+    handler = RotatingFileHandler(os.path.join(pasta, ARQUIVO_LOG), maxBytes=TAMANHO_LOG, backupCount=BACKUPS_LOG, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s | %(message)s"))
+    _logger.addHandler(handler)
+    _logger.setLevel(logging.INFO)
+    _logger.propagate = False
+
+@contextmanager
+def capturar_cprofile(destino, pasta=PASTA_LOGS):
+    """Roda o bloco sob o cProfile; grava o `.prof` em `pasta` e preenche `destino`
+    com `texto` (funções de maior tempo acumulado) e `caminho`.
+
+    `destino` é preenchido mesmo quando o bloco sai por exceção (inclusive as de
+    controle do Streamlit, como `st.stop`/`st.rerun`), que segue propagada.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield destino
+    finally:
+        profiler.disable()
+        os.makedirs(pasta, exist_ok=True)
+        destino["caminho"] = os.path.join(pasta, time.strftime("cprofile_%Y%m%d_%H%M%S.prof"))
+        profiler.dump_stats(destino["caminho"])
+        saida = io.StringIO()
+        pstats.Stats(profiler, stream=saida).sort_stats("cumulative").print_stats(LINHAS_CPROFILE)
+        destino["texto"] = saida.getvalue()
@@ -0,0 +1,318 @@
+import os
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from difflib import get_close_matches
+from functools import lru_cache
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from cronometragem.perfil import etapa
+
+# --- COLUNAS PADRÃO ---
+COL_CATEGORIA, COL_EVENTO = "CATEGORIA", "Evento"
+COL_SUBCATEGORIA, COL_PILOTO = "SUBCATEGORIA", "Piloto"
+COL_VOLTA, COL_TT = "Volta", "Tempo Total da Volta"
+COL_S1, COL_S2, COL_S3 = "Setor 1", "Setor 2", "Setor 3"
+COL_VEL, COL_HORARIO = "TOP SPEED", "Horário"
+COLS_TEMPO = [COL_TT, COL_S1, COL_S2, COL_S3]
+
+# Formatos rápidos aceitos por `parse_tempo`: "M:SS.mmm" e "SS.mmm".
+_PAT_MIN_SEG = r"\d{1,2}:\d{2}\.\d{1,3}"
+_PAT_SEG = r"\d{1,3}\.\d{1,3}"
+
+def parse_tempo(txt):
+    if pd.isna(txt): return pd.NaT
+    s = str(txt).strip().replace(',', '.')
+    if re.fullmatch(_PAT_MIN_SEG, s):
+        m, r = s.split(':')
+        return pd.to_timedelta(int(m) * 60 + float(r), unit='s')
+    if re.fullmatch(_PAT_SEG, s):
+        return pd.to_timedelta(float(s), unit='s')
+    if 'days' in s:
+        return pd.to_timedelta(s, errors='coerce')
+    return pd.to_timedelta(s, errors='coerce')
+
+def parse_tempo_coluna(serie):
+    """Versão vetorizada de `parse_tempo` para uma coluna inteira.
+
+    Os formatos "M:SS.mmm" e "SS.mmm" (com vírgula ou ponto) são convertidos
+    com operações de string sobre a coluna e aritmética inteira em
+    milissegundos. O que sobrar (ex.: "0 days 00:01:49.379000") cai em
+    `parse_tempo`, aplicado apenas uma vez por valor distinto.
+    """
+    if pd.api.types.is_timedelta64_dtype(serie): return serie
+    resultado = pd.Series(pd.NaT, index=serie.index, dtype="timedelta64[ns]")
+    presentes = serie.notna()
+    if not presentes.any(): return resultado
+
+    s = serie[presentes].astype(str).str.strip().str.replace(',', '.', regex=False)
+    rapidos = s.str.fullmatch(_PAT_MIN_SEG) | s.str.fullmatch(_PAT_SEG)
+
+    if rapidos.any():
+        r = s[rapidos]
+        # "1:49.379" -> 149379; as casas decimais e a presença de ":" dizem
+        # onde cortar o inteiro em minutos, segundos e milésimos.
+        digitos = r.str.replace(':', '', regex=False).str.replace('.', '', regex=False).astype(np.int64).to_numpy()
+        casas = (r.str.len() - r.str.find('.') - 1).to_numpy(np.int64)
+        tem_minutos = r.str.contains(':', regex=False).to_numpy(bool)
+        escala = 10 ** casas
+        inteiro = digitos // escala
+        milis = digitos % escala * (1000 // escala)
+        segundos = np.where(tem_minutos, inteiro % 100, inteiro)
+        minutos = np.where(tem_minutos, inteiro // 100, 0)
+        total_ms = minutos * 60_000 + segundos * 1_000 + milis
+        resultado[rapidos.reindex(resultado.index, fill_value=False)] = pd.to_timedelta(total_ms, unit='ms')
+
+    resto = s[~rapidos]
+    if not resto.empty:
+        unicos = pd.unique(resto)
+        mapa = pd.Series([parse_tempo(v) for v in unicos], index=unicos, dtype="timedelta64[ns]")
+        resultado.loc[resto.index] = resto.map(mapa).to_numpy()
+    return resultado
+
+def fmt_tempo(td):
+    if pd.isna(td) or td is None: return "---"
+    s = td.total_seconds()
+    m = int(round(s * 1000) % 1000)
+    n = int(s // 60)
+    c = int(s % 60)
+    return f"{n:01d}:{c:02d}.{m:03d}"
+
+def formatar_diff_span(td_or_float, unit=""):
+    if pd.isna(td_or_float): return ""
+    value_num = td_or_float.total_seconds() if isinstance(td_or_float, pd.Timedelta) else td_or_float
+    if pd.isna(value_num): return ""
+    if value_num == 0: return f"<span class='diff-zero'>0.000 {unit}</span>"
+    sinal = "+" if value_num > 0 else ""
+    classe = "diff-pos" if value_num > 0 else "diff-neg"
+    icone = "▲" if value_num > 0 else "▼"
+    return f"<span class='{classe}'>{sinal}{value_num:.3f} {icone} {unit}</span>"
+
+def normalizar_tipos_dados(df):
+    for c in COLS_TEMPO:
+        if c in df.columns:
+            df[c] = parse_tempo_coluna(df[c])
+    if COL_VEL in df.columns and not pd.api.types.is_numeric_dtype(df[COL_VEL]):
+        df[COL_VEL] = pd.to_numeric(df[COL_VEL].astype(str).str.replace(',', '.'), errors='coerce')
+    return df
+
+def limpar_nome_para_juncao(texto):
+    if pd.isna(texto): return ""
+    texto = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii')
+    texto = re.sub(r'^\d+\s*-\s*', '', texto)
+    return texto.lower().strip()
+
+# --- IDENTIDADE DOS PILOTOS ---
+# Nomes vêm como "<número> - <Nome> - <CLASSE>" (ex.: "121 - Denis FERRER - TROPHY");
+# número e classe são opcionais.
+_PAT_PILOTO = re.compile(r'^\s*(?:(?P<numero>\d+)\s*-\s*)?(?P<nome>.*?)(?:\s+-\s+(?P<classe>[^-]+?))?\s*$')
+
+def identificar_piloto(texto):
+    """Separa o nome do piloto em `(número, nome, classe)`; partes ausentes vêm como `None`."""
+    if pd.isna(texto): return None, None, None
+    m = _PAT_PILOTO.match(str(texto))
+    return m.group('numero'), m.group('nome') or None, m.group('classe')
+
+def por_valor_unico(serie, funcao):
+    """Aplica `funcao` só aos valores distintos de `serie` e devolve o resultado linha a linha pelos códigos."""
+    codigos, unicos = pd.factorize(serie)
+    valores = pd.Series([funcao(u) for u in unicos], dtype=object)
+    return pd.Series(valores.reindex(codigos).to_numpy(), index=serie.index)
+
+def ler_mapa_subcategorias(caminho_subcat):
+    try:
+        mapa = pd.read_csv(caminho_subcat, sep=';', encoding='utf-8-sig')
+    except UnicodeDecodeError:
+        mapa = pd.read_csv(caminho_subcat, sep=';', encoding='latin-1')
+    if len(mapa.columns) < 2:
+        raise ValueError(f"ERRO: Arquivo '{caminho_subcat}' precisa ter pelo menos 2 colunas.")
+    return mapa.rename(columns={mapa.columns[0]: 'Piloto', mapa.columns[1]: 'SUBCATEGORIA_LIDA'})
+
+def _subcategoria_por_chave(mapa):
+    chaves = mapa['Piloto'].map(limpar_nome_para_juncao)
+    # Chave repetida no cadastro: vale a primeira linha (o merge antigo duplicava as voltas).
+    return dict(zip(chaves[::-1], mapa['SUBCATEGORIA_LIDA'][::-1]))
+
+def aplicar_subcategorias(df, mapa):
+    subcat_por_chave = _subcategoria_por_chave(mapa)
+    subcats = por_valor_unico(df[COL_PILOTO], lambda p: subcat_por_chave.get(limpar_nome_para_juncao(p)))
+    df = df.drop(columns=[COL_SUBCATEGORIA], errors='ignore')
+    df[COL_SUBCATEGORIA] = subcats
+    return df
+
+@lru_cache(maxsize=4096)
+def _sugestao_cadastro(chave, chaves_cadastro):
+    sugestoes = get_close_matches(chave, chaves_cadastro, n=1, cutoff=0.75)
+    return sugestoes[0] if sugestoes else None
+
+COLS_NAO_CADASTRADOS = ['Piloto', 'Número', 'Nome', 'Classe', 'Sugestão do cadastro']
+
+def pilotos_nao_cadastrados(df, mapa):
+    """Pilotos distintos de `df` sem subcategoria no cadastro, com a sugestão mais parecida do cadastro.
+
+    Espera os nomes como vieram da exportação (antes de `preparar_etapa`), para o número do carro aparecer.
+    """
+    cadastrados = mapa.dropna(subset=['Piloto'])
+    nome_por_chave = dict(zip(cadastrados['Piloto'].map(limpar_nome_para_juncao)[::-1], cadastrados['Piloto'][::-1]))
+    chaves_cadastro = tuple(sorted(nome_por_chave))
+    linhas = []
+    for piloto in df[COL_PILOTO].dropna().unique():
+        chave = limpar_nome_para_juncao(piloto)
+        if chave in nome_por_chave: continue
+        numero, nome, classe = identificar_piloto(piloto)
+        sugestao = _sugestao_cadastro(chave, chaves_cadastro)
+        linhas.append({'Piloto': piloto, 'Número': numero, 'Nome': nome, 'Classe': classe,
+                       'Sugestão do cadastro': nome_por_chave.get(sugestao)})
+    return pd.DataFrame(linhas, columns=COLS_NAO_CADASTRADOS)
+
+def relatorio_cadastro(df, caminho_subcat):
+    """`pilotos_nao_cadastrados` de `df` contra o cadastro em `caminho_subcat`; vazio sem cadastro legível."""
+    if not caminho_subcat or not os.path.exists(caminho_subcat) or df.empty:
+        return pd.DataFrame(columns=COLS_NAO_CADASTRADOS)
+    try:
+        mapa = ler_mapa_subcategorias(caminho_subcat)
+    except Exception:
+        return pd.DataFrame(columns=COLS_NAO_CADASTRADOS)
+    return pilotos_nao_cadastrados(df, mapa)
+
+def preparar_etapa(df, caminho_subcat):
+    """Junta as subcategorias, normaliza os tipos e limpa o número do nome dos pilotos.
+
+    Retorna `(df, erro)`; se o mapa de subcategorias não puder ser aplicado,
+    `erro` traz a mensagem e a etapa segue sem elas.
+    """
+    erro = None
+    df = df.copy()
+    with etapa("Subcategorias", len(df)):
+        if caminho_subcat and os.path.exists(caminho_subcat):
+            try:
+                df = aplicar_subcategorias(df, ler_mapa_subcategorias(caminho_subcat))
+            except ValueError as e:
+                erro = str(e)
+            except Exception as e:
+                erro = f"Ocorreu um erro ao processar o arquivo '{caminho_subcat}': {e}"
+
+        if COL_SUBCATEGORIA not in df.columns:
+            df[COL_SUBCATEGORIA] = "N/A"
+        df[COL_SUBCATEGORIA] = df[COL_SUBCATEGORIA].fillna("NÃO CADASTRADO")
+
+    with etapa("Normalização", len(df)):
+        df = normalizar_tipos_dados(df)
+        df[COL_PILOTO] = por_valor_unico(df[COL_PILOTO], lambda p: re.sub(r'^\d+\s*-\s*', '', p).strip()).astype('str')
+    return df, erro
+
+def nomes_do_arquivo(filename):
+    categoria_nome, evento_nome = "Desconhecida", "Sessão Desconhecida"
+    if filename:
+        base = os.path.basename(filename).upper().replace('- LAPTIMES.CSV', '').replace('.CSV', '').strip()
+        parts = base.split(' - ')
+        if len(parts) > 1:
+            categoria_nome, evento_nome = parts[0].strip(), ' - '.join(parts[1:]).strip()
+        else:
+            evento_nome = parts[0].strip()
+    return categoria_nome, evento_nome
+
+def ler_exportacao(src, filename=""):
+    """Lê uma exportação bruta do sistema de cronometragem.
+
+    Igual a `ler_csv_original`, mas levanta `ValueError` explicando por que o
+    arquivo não pôde ser lido em vez de devolver um DataFrame vazio.
+    """
+    categoria_nome, evento_nome = nomes_do_arquivo(filename)
+
+    if hasattr(src, "seek"): src.seek(0)
+    conteudo = src.getvalue() if hasattr(src, "getvalue") else src
+
+    pos = conteudo.find(b"Lap Tm")
+    if pos == -1: raise ValueError("cabeçalho com 'Lap Tm' não encontrado")
+    inicio_cabecalho = conteudo.rfind(b"\n", 0, pos) + 1
+
+    # O BytesIO compartilha o buffer de `conteudo`; o parser em C lê direto a
+    # partir do cabeçalho, sem decodificar nem recortar o arquivo inteiro.
+    buf = BytesIO(conteudo)
+    buf.seek(inicio_cabecalho)
+    df_alt = pd.read_csv(buf, sep=',', quotechar='"', encoding='utf-8', encoding_errors='ignore')
+
+    return mapear_voltas(df_alt, categoria_nome, evento_nome)
+
+_PAT_HORA_DO_DIA = r'\d{1,2}:\d{2}:\d{2}(?:\.\d{1,3})?'
+
+def linhas_de_piloto(df_alt, col_hora=None):
+    """Linhas de piloto: sem volta nem tempo e com o nome (não um horário) na coluna de horário.
+
+    Linhas sem volta mas com horário (passagens pela linha, boxe) não trocam o
+    piloto em vigor. O regex só roda nas poucas linhas candidatas.
+    """
+    col_hora = col_hora or next(c for c in df_alt.columns if "Time" in c)
+    candidatas = df_alt['Lap'].isna() & df_alt['Lap Tm'].isna()
+    texto = df_alt.loc[candidatas, col_hora].astype(str).str.strip()
+    horario = texto.str.fullmatch(_PAT_HORA_DO_DIA) | df_alt.loc[candidatas, col_hora].isna()
+    return candidatas & ~horario.reindex(df_alt.index, fill_value=False)
+
+def mapear_voltas(df_alt, categoria_nome, evento_nome, piloto_anterior=None):
+    """Converte as linhas de uma exportação (já com o cabeçalho original) nas colunas padrão.
+
+    `piloto_anterior` é o piloto em vigor antes da primeira linha de `df_alt`,
+    para quando a exportação é lida em pedaços.
+    """
+    if 'Driver' in df_alt.columns and COL_PILOTO not in df_alt.columns:
+        df_alt = df_alt.rename(columns={'Driver': COL_PILOTO})
+
+    col_hora = next((c for c in df_alt.columns if "Time" in c), None)
+    if not col_hora: raise ValueError("coluna de horário ('Time') não encontrada")
+
+    pilotos = df_alt[col_hora].where(linhas_de_piloto(df_alt, col_hora)).ffill()
+    if piloto_anterior is not None:
+        pilotos = pilotos.fillna(piloto_anterior)
+    df_alt = df_alt.assign(Piloto_tmp=pilotos).dropna(subset=['Lap', 'Lap Tm'])
+
+    return pd.DataFrame({
+        COL_CATEGORIA: categoria_nome, COL_EVENTO: evento_nome, COL_SUBCATEGORIA: "N/A",
+        COL_PILOTO: df_alt["Piloto_tmp"], COL_HORARIO: df_alt[col_hora],
+        COL_VOLTA: df_alt["Lap"], COL_TT: df_alt["Lap Tm"],
+        COL_S1: df_alt.get("S1 Tm"), COL_S2: df_alt.get("S2 Tm"),
+        COL_S3: df_alt.get("S3 Tm"), COL_VEL: df_alt.get("Speed"),
+    })
+
+def ler_csv_original(src, filename=""):
+    try:
+        return ler_exportacao(src, filename)
+    except Exception:
+        return pd.DataFrame()
+
+def _ler_item(item):
+    nome, conteudo = item
+    try:
+        df = ler_exportacao(conteudo, filename=nome)
+    except Exception as e:
+        return nome, None, str(e) or type(e).__name__
+    if df.empty: return nome, None, "nenhuma volta encontrada"
+    return nome, df, None
+
+def ler_exportacoes(arquivos, max_workers=None, usar_processos=False):
+    """Lê várias exportações em paralelo e concatena o resultado.
+
+    `arquivos` é uma lista de pares `(nome, conteúdo)` ou de objetos com
+    `.name` e `.getvalue()` (como os do `st.file_uploader`). Por padrão usa
+    threads; `usar_processos=True` troca por um pool de processos. Retorna
+    `(df, falhas)`, onde `falhas` lista `(nome, mensagem)` dos arquivos que não
+    puderam ser lidos ou vieram sem voltas.
+    """
+    itens = [(f.name, f.getvalue()) if hasattr(f, "getvalue") else tuple(f) for f in arquivos]
+    itens = [(nome, conteudo) for nome, conteudo in itens if not os.path.basename(nome).startswith('.')]
+    if not itens: return pd.DataFrame(), []
+
+    workers = max_workers or min(len(itens), os.cpu_count() or 1)
+    if workers > 1:
+        pool = ProcessPoolExecutor if usar_processos else ThreadPoolExecutor
+        with pool(max_workers=workers) as executor:
+            resultados = list(executor.map(_ler_item, itens))
+    else:
+        resultados = [_ler_item(item) for item in itens]
+
+    dfs = [df for _, df, _ in resultados if df is not None]
+    falhas = [(nome, erro) for nome, _, erro in resultados if erro]
+    return (pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()), falhas
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from cronometragem.compacto import tempos_em_ms
+from cronometragem.processamento import (
+    COL_CATEGORIA, COL_EVENTO, COL_PILOTO, COL_S1, COL_S2, COL_S3, COL_TT, COL_VOLTA,
+)
+from cronometragem.validade import COL_SAIDA, COL_VALIDA
+
+# --- STINTS ---
+# Um stint começa na volta de saída (boxe ou lacuna no horário, ver
+# `classificar_voltas`) e vai até a volta de entrada. Ritmo, degradação e
+# consistência usam só as voltas válidas; a volta ideal usa os melhores setores
+# registrados no stint.
+COL_STINT, COL_VOLTA_STINT, COL_RITMO = "Stint", "Volta no Stint", "Ritmo"
+ST_VOLTAS, ST_VALIDAS = "Voltas", "Voltas Válidas"
+ST_DA_VOLTA, ST_ATE_VOLTA = "Da Volta", "Até a Volta"
+ST_RITMO, ST_MELHOR, ST_IDEAL = "Ritmo Médio", "Melhor Volta", "Volta Ideal"
+ST_DEGRADACAO, ST_DESVIO, ST_IQR = "Degradação (s/volta)", "Desvio (s)", "IQR (s)"
+JANELA_RITMO = 5
+MIN_VOLTAS_REGRESSAO = 3
+
+def _ms_para_timedelta(valores):
+    return pd.to_timedelta(np.round(valores), unit="ms").astype("timedelta64[ns]")
+
+def analisar_stints(df):
+    """Stints de todos os pilotos/sessões de uma etapa (padrão ou compacta), em passadas agrupadas.
+
+    Retorna `(voltas, resumo)`: `voltas` tem, por volta (mesmo índice de `df`),
+    o número do stint, a posição no stint e o ritmo (média das últimas
+    `JANELA_RITMO` voltas válidas do stint até ela); `resumo` tem uma linha por stint.
+    """
+    chaves = [COL_CATEGORIA, COL_EVENTO, COL_PILOTO]
+    if df.empty or not set(chaves + [COL_VOLTA, COL_TT]) <= set(df.columns):
+        return pd.DataFrame(), pd.DataFrame()
+
+    grupos = df.groupby(chaves, observed=True, sort=False).ngroup().to_numpy()
+    voltas_num = df[COL_VOLTA].astype("float64").to_numpy(na_value=np.nan)
+    ordem = np.lexsort((voltas_num, grupos))
+    ordem = ordem[grupos[ordem] >= 0]
+    n = len(ordem)
+    if n == 0: return pd.DataFrame(), pd.DataFrame()
+    g = grupos[ordem]
+    posicoes = np.arange(n)
+
+    inicio_grupo = np.r_[True, g[1:] != g[:-1]]
+    saida = df[COL_SAIDA].to_numpy(bool)[ordem] if COL_SAIDA in df.columns else np.zeros(n, bool)
+    novo_stint = inicio_grupo | saida
+    stint = np.cumsum(novo_stint) - 1
+    numero_stint = stint - np.maximum.accumulate(np.where(inicio_grupo, stint, 0)) + 1
+    volta_no_stint = posicoes - np.maximum.accumulate(np.where(novo_stint, posicoes, 0)) + 1
+
+    tt = tempos_em_ms(df[COL_TT])[ordem]
+    valida = df[COL_VALIDA].to_numpy(bool)[ordem] if COL_VALIDA in df.columns else ~np.isnan(tt)
+    y = np.where(valida, tt, np.nan)
+
+    # Média das últimas `JANELA_RITMO` voltas válidas do stint, repetida nas
+    # inválidas seguintes; antes da primeira válida fica vazio.
+    ritmo = np.full(n, np.nan)
+    ritmo[valida] = pd.Series(tt[valida]).groupby(stint[valida]).rolling(JANELA_RITMO, min_periods=1).mean().to_numpy()
+    ritmo = pd.Series(ritmo).groupby(stint).ffill().to_numpy()
+
+    # Regressão linear tempo x volta no stint, pelas somas agrupadas das voltas válidas.
+    x = np.where(valida, volta_no_stint, 0.0)
+    yv = np.where(valida, tt, 0.0)
+    base = pd.DataFrame({
+        "stint": stint, "volta": voltas_num[ordem], "y": y, "valida": valida,
+        "x": x, "yv": yv, "xy": x * yv, "xx": x * x,
+        COL_S1: tempos_em_ms(df[COL_S1])[ordem] if COL_S1 in df.columns else np.nan,
+        COL_S2: tempos_em_ms(df[COL_S2])[ordem] if COL_S2 in df.columns else np.nan,
+        COL_S3: tempos_em_ms(df[COL_S3])[ordem] if COL_S3 in df.columns else np.nan,
+    })
+    agrupado = base.groupby("stint", sort=True)
+    somas = agrupado[["valida", "x", "yv", "xy", "xx"]].sum()
+    k = somas["valida"].to_numpy(float)
+    denominador = k * somas["xx"].to_numpy() - somas["x"].to_numpy() ** 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        inclinacao = (k * somas["xy"].to_numpy() - somas["x"].to_numpy() * somas["yv"].to_numpy()) / denominador
+    inclinacao = np.where((k >= MIN_VOLTAS_REGRESSAO) & (denominador > 0), inclinacao / 1000, np.nan)
+
+    estat = agrupado.agg(voltas=("volta", "size"), da=("volta", "min"), ate=("volta", "max"),
+                         ritmo=("y", "mean"), melhor=("y", "min"), desvio=("y", "std"),
+                         s1=(COL_S1, "min"), s2=(COL_S2, "min"), s3=(COL_S3, "min"))
+    quartis = agrupado["y"].quantile([0.25, 0.75]).unstack()
+    primeiras = ordem[np.flatnonzero(novo_stint)]
+
+    resumo = pd.DataFrame({
+        COL_CATEGORIA: df[COL_CATEGORIA].to_numpy()[primeiras],
+        COL_EVENTO: df[COL_EVENTO].to_numpy()[primeiras],
+        COL_PILOTO: df[COL_PILOTO].to_numpy()[primeiras],
+        COL_STINT: numero_stint[novo_stint],
+        ST_VOLTAS: estat["voltas"].to_numpy(),
+        ST_VALIDAS: k.astype(int),
+        ST_DA_VOLTA: estat["da"].to_numpy(),
+        ST_ATE_VOLTA: estat["ate"].to_numpy(),
+        ST_RITMO: _ms_para_timedelta(estat["ritmo"].to_numpy()),
+        ST_MELHOR: _ms_para_timedelta(estat["melhor"].to_numpy()),
+        ST_DEGRADACAO: inclinacao,
+        ST_DESVIO: estat["desvio"].to_numpy() / 1000,
+        ST_IQR: (quartis[0.75] - quartis[0.25]).to_numpy() / 1000,
+        ST_IDEAL: _ms_para_timedelta(estat[["s1", "s2", "s3"]].sum(axis=1, min_count=3).to_numpy()),
+    })
+
+    voltas = pd.DataFrame({
+        COL_STINT: numero_stint, COL_VOLTA_STINT: volta_no_stint, COL_RITMO: _ms_para_timedelta(ritmo),
+    }, index=df.index[ordem]).reindex(df.index)
+    return voltas, resumo
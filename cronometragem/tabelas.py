@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from cronometragem.processamento import COL_TT, COL_S1, COL_S2, COL_S3, COL_VEL, COLS_TEMPO
+
+# --- TABELA COMPLETA DE VOLTAS ---
+ESTILO_MELHOR_VOLTA = 'color: #00BFFF; font-weight: bold;'
+ESTILO_MELHOR_SETOR = 'background-color: #483D8B; color: white;'
+ESTILO_MAIOR_VEL = 'background-color: #2E8B57; color: white;'
+TAMANHO_PAGINA = 500
+
+def fmt_tempo_coluna(serie):
+    """`fmt_tempo` aplicado à coluna inteira de uma vez ("M:SS.mmm", "---" para vazios)."""
+    validos = serie.notna().to_numpy()
+    ms = np.round(serie.to_numpy("timedelta64[ns]").astype(np.int64) / 1e6).astype(np.int64)
+    minutos = pd.Series(ms // 60_000, index=serie.index).astype(str)
+    segundos = pd.Series(ms // 1000 % 60, index=serie.index).astype(str).str.zfill(2)
+    milis = pd.Series(ms % 1000, index=serie.index).astype(str).str.zfill(3)
+    texto = minutos + ":" + segundos + "." + milis
+    return texto.where(validos, "---")
+
+def destaques_melhores(best_lap, best_s1, best_s2, best_s3, best_vel):
+    """Mapa coluna -> (valor de referência, estilo) usado por `estilos_por_mascara`."""
+    return {
+        COL_TT: (best_lap, ESTILO_MELHOR_VOLTA),
+        COL_S1: (best_s1, ESTILO_MELHOR_SETOR),
+        COL_S2: (best_s2, ESTILO_MELHOR_SETOR),
+        COL_S3: (best_s3, ESTILO_MELHOR_SETOR),
+        COL_VEL: (best_vel, ESTILO_MAIOR_VEL),
+    }
+
+def estilos_por_mascara(df, destaques):
+    """DataFrame de CSS do tamanho de `df`: uma comparação vetorizada por coluna destacada."""
+    estilos = pd.DataFrame('', index=df.index, columns=df.columns)
+    for col, (valor, estilo) in destaques.items():
+        if col not in df.columns or valor is None or pd.isna(valor): continue
+        estilos[col] = np.where(df[col].eq(valor).fillna(False).to_numpy(bool), estilo, '')
+    return estilos
+
+def pagina_voltas_estilizada(df, destaques, pagina=1, tamanho=TAMANHO_PAGINA):
+    """Styler de uma página de `df`: só as linhas visíveis são formatadas e estilizadas."""
+    inicio = (pagina - 1) * tamanho
+    trecho = df.iloc[inicio:inicio + tamanho]
+    estilos = estilos_por_mascara(trecho, destaques)
+    exibicao = trecho.copy()
+    for c in COLS_TEMPO:
+        if c in exibicao.columns:
+            exibicao[c] = fmt_tempo_coluna(exibicao[c])
+    return exibicao.style.apply(lambda _: estilos, axis=None)
+
+def total_paginas(n_linhas, tamanho=TAMANHO_PAGINA):
+    return max(1, -(-n_linhas // tamanho))
+
+# --- TABELA HTML DE COMPARAÇÃO (PILOTOS OU SESSÕES) ---
+CSS_COMPARACAO = """<style> .table-container { overflow-x: auto; } .comp-table { width: 100%; border-collapse: collapse; font-size: 0.9em; } .comp-table th, .comp-table td { padding: 6px 8px; text-align: center; white-space: nowrap; } .comp-table th { font-family: sans-serif; border-bottom: 2px solid #444; } .comp-table td { border-bottom: 1px solid #333; line-height: 1.3; } .comp-table tr:hover td { background-color: #2e2e2e; } .comp-table b { font-size: 1.1em; } .diff-span { font-size: 0.9em; display: block; } .diff-pos { color: #ff4d4d !important; } .diff-neg { color: #4dff4d !important; } .diff-zero { color: #888; } </style>"""
+
+def _diff_spans(diff, unidade):
+    """Mesmo HTML de `formatar_diff_span` (dentro do span `diff-span`) para um array de diferenças."""
+    valor = np.char.mod('%+.3f', np.nan_to_num(diff))
+    valor = np.where(diff > 0, valor, np.char.lstrip(valor, '+'))
+    classe = np.where(diff > 0, 'diff-pos', 'diff-neg')
+    icone = np.where(diff > 0, '▲', '▼')
+    span = ("<span class='diff-span'><span class='" + pd.Series(classe.ravel()) + "'>" + pd.Series(valor.ravel())
+            + " " + pd.Series(icone.ravel()) + f" {unidade}</span></span>").to_numpy(object).reshape(diff.shape)
+    span = np.where(diff == 0, f"<span class='diff-span'><span class='diff-zero'>0.000 {unidade}</span></span>", span)
+    return np.where(np.isnan(diff), "", span)
+
+def tabela_comparativa_html(pivot, colunas, referencia=None, tempo=True, unidade=""):
+    """HTML da tabela volta x coluna (piloto ou sessão) com a diferença para a coluna de referência.
+
+    `pivot` é o resultado de `pivot_table(index=Volta, columns=...)`. A matriz
+    de diferenças é calculada de uma vez, as células são formatadas em bloco e
+    o HTML é montado com um único `join`.
+    """
+    matriz = pivot.reindex(columns=colunas)
+    n_voltas, n_cols = matriz.shape
+
+    if tempo:
+        vazios = matriz.isna().to_numpy()
+        ns = np.empty((n_voltas, n_cols), dtype=np.int64)
+        for j, c in enumerate(colunas):
+            ns[:, j] = pd.to_timedelta(matriz[c]).to_numpy("timedelta64[ns]").astype(np.int64)
+        valores = np.where(vazios, np.nan, ns.astype(float))
+        textos = fmt_tempo_coluna(pd.to_timedelta(pd.Series(valores.ravel()), unit="ns")).to_numpy(object).reshape(valores.shape)
+    else:
+        valores = matriz.to_numpy(float)
+        textos = np.where(np.isnan(valores), "---", np.char.mod('%.1f', np.nan_to_num(valores)).astype(object))
+
+    if referencia is not None and referencia in colunas:
+        ref = valores[:, colunas.index(referencia)][:, None]
+        diff = (valores - ref) / 1e9 if tempo else valores - ref
+        diff[:, colunas.index(referencia)] = np.nan
+        spans = _diff_spans(diff, unidade)
+    else:
+        spans = np.full(valores.shape, "", dtype=object)
+
+    celulas = "<td>" + pd.Series(textos.ravel()) + f" {unidade}" + pd.Series(spans.ravel()) + "</td>"
+    corpo = np.empty((n_voltas, n_cols + 2), dtype=object)
+    corpo[:, 0] = [f"<tr><td><b>{int(v)}</b></td>" for v in matriz.index]
+    corpo[:, 1:-1] = celulas.to_numpy(object).reshape(n_voltas, n_cols)
+    corpo[:, -1] = "</tr>"
+
+    cabecalho = "".join(f"<th>{c}</th>" for c in colunas)
+    return "".join([
+        f"{CSS_COMPARACAO}<div class='table-container'><table class='comp-table'><thead><tr><th>Volta</th>",
+        cabecalho, "</tr></thead><tbody>", *corpo.ravel().tolist(), "</tbody></table></div>",
+    ])
@@ -0,0 +1,133 @@
+import json
+import os
+import shutil
+from urllib.parse import unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from cronometragem.agregados import AG_IDX_MELHOR_VOLTA, AG_IDX_TOP_SPEED, calcular_agregados
+from cronometragem.armazenamento import assinatura_arquivo, carregar_etapa_enriquecida
+from cronometragem.processamento import COL_CATEGORIA, COL_PILOTO
+
+# --- ÍNDICE DA TEMPORADA ---
+# Fica em <pasta das etapas>/.temporada: voltas particionadas por etapa/categoria
+# (ordenadas por piloto, em row groups pequenos para o filtro por piloto pular o
+# resto), agregados particionados por etapa e um manifesto com a assinatura de
+# cada CSV já indexado. O piloto não vira pasta: seriam centenas de arquivos
+# minúsculos por etapa, e as estatísticas dos row groups já fazem o corte.
+PASTA_TEMPORADA = ".temporada"
+COL_ETAPA = "ETAPA"
+# Sobe quando muda o que é gravado por etapa (colunas, classificação das voltas): força reindexar tudo.
+VERSAO_INDICE = 2
+_LINHAS_POR_GRUPO = 2000
+
+def _pastas(pasta_etapas):
+    raiz = os.path.join(pasta_etapas, PASTA_TEMPORADA)
+    return raiz, os.path.join(raiz, "voltas"), os.path.join(raiz, "agregados"), os.path.join(raiz, "manifesto.json")
+
+def nome_etapa(arquivo):
+    return os.path.splitext(os.path.basename(arquivo))[0].strip()
+
+def _ler_manifesto(caminho):
+    if not os.path.exists(caminho): return {}
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _gravar_manifesto(caminho, manifesto):
+    tmp = caminho + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, caminho)
+
+def _remover_etapa(pasta_dataset, etapa):
+    if not os.path.isdir(pasta_dataset): return
+    for nome in os.listdir(pasta_dataset):
+        if nome.startswith(f"{COL_ETAPA}=") and unquote(nome.split("=", 1)[1]) == etapa:
+            shutil.rmtree(os.path.join(pasta_dataset, nome), ignore_errors=True)
+
+def _gravar_particoes(df, pasta_dataset, colunas_particao):
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_to_dataset(tabela, pasta_dataset, partition_cols=colunas_particao,
+                        existing_data_behavior="delete_matching", max_rows_per_group=_LINHAS_POR_GRUPO)
+
+def _indexar_etapa(caminho_csv, caminho_subcat, pasta_voltas, pasta_agregados):
+    etapa = nome_etapa(caminho_csv)
+    df, _, _ = carregar_etapa_enriquecida(caminho_csv, caminho_subcat)
+    df = df.assign(**{COL_ETAPA: etapa})
+    agregados = calcular_agregados(df).drop(columns=[AG_IDX_MELHOR_VOLTA, AG_IDX_TOP_SPEED])
+    agregados[COL_ETAPA] = etapa
+
+    for c in df.columns:
+        if isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype(str)
+    for c in agregados.columns:
+        if isinstance(agregados[c].dtype, pd.CategoricalDtype):
+            agregados[c] = agregados[c].astype(str)
+    df = df.sort_values([COL_CATEGORIA, COL_PILOTO], kind="stable")
+
+    _remover_etapa(pasta_voltas, etapa)
+    _remover_etapa(pasta_agregados, etapa)
+    _gravar_particoes(df, pasta_voltas, [COL_ETAPA, COL_CATEGORIA])
+    _gravar_particoes(agregados, pasta_agregados, [COL_ETAPA])
+
+def atualizar_temporada(pasta_etapas, caminho_subcat):
+    """Atualiza o índice da temporada e retorna a lista de etapas (re)indexadas.
+
+    Só reprocessa os CSVs cuja assinatura (mtime + hash) mudou; etapas cujo CSV
+    sumiu são removidas. Se o mapa de subcategorias ou `VERSAO_INDICE` mudar,
+    tudo é reindexado.
+    """
+    raiz, pasta_voltas, pasta_agregados, caminho_manifesto = _pastas(pasta_etapas)
+    os.makedirs(raiz, exist_ok=True)
+    manifesto = _ler_manifesto(caminho_manifesto)
+    etapas_antigas = manifesto.get("etapas", {})
+
+    assinatura_subcat = list(assinatura_arquivo(caminho_subcat) or [])[1:]
+    if manifesto.get("subcategorias") != assinatura_subcat or manifesto.get("versao") != VERSAO_INDICE:
+        etapas_antigas = {}
+
+    arquivos = sorted(f for f in os.listdir(pasta_etapas) if f.lower().endswith(".csv"))
+    etapas, atualizadas = {}, []
+    for arquivo in arquivos:
+        caminho = os.path.join(pasta_etapas, arquivo)
+        assinatura = list(assinatura_arquivo(caminho))[1:]
+        etapa = nome_etapa(arquivo)
+        if etapas_antigas.get(etapa) != assinatura:
+            _indexar_etapa(caminho, caminho_subcat, pasta_voltas, pasta_agregados)
+            atualizadas.append(etapa)
+        etapas[etapa] = assinatura
+
+    for etapa in set(etapas_antigas) - set(etapas):
+        _remover_etapa(pasta_voltas, etapa)
+        _remover_etapa(pasta_agregados, etapa)
+
+    if atualizadas or set(etapas_antigas) != set(etapas) or manifesto.get("subcategorias") != assinatura_subcat:
+        _gravar_manifesto(caminho_manifesto, {"versao": VERSAO_INDICE, "subcategorias": assinatura_subcat, "etapas": etapas})
+    return atualizadas
+
+def _dataset(pasta):
+    return ds.dataset(pasta, format="parquet", partitioning="hive")
+
+def agregados_temporada(pasta_etapas, pilotos=None):
+    """Agregados (categoria, evento, piloto) de todas as etapas indexadas, com a coluna ETAPA."""
+    _, _, pasta_agregados, _ = _pastas(pasta_etapas)
+    if not os.path.isdir(pasta_agregados): return pd.DataFrame()
+    filtro = ds.field(COL_PILOTO).isin(list(pilotos)) if pilotos is not None else None
+    return _dataset(pasta_agregados).to_table(filter=filtro).to_pandas()
+
+def voltas_temporada(pasta_etapas, piloto, etapas=None, categoria=None):
+    """Voltas de um piloto na temporada; só as partições/row groups necessários são lidos."""
+    _, pasta_voltas, _, _ = _pastas(pasta_etapas)
+    if not os.path.isdir(pasta_voltas): return pd.DataFrame()
+    filtro = ds.field(COL_PILOTO) == piloto
+    if etapas is not None:
+        filtro &= ds.field(COL_ETAPA).isin(list(etapas))
+    if categoria is not None:
+        filtro &= ds.field(COL_CATEGORIA) == categoria
+    return _dataset(pasta_voltas).to_table(filter=filtro).to_pandas()
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from cronometragem.compacto import horario_em_ms, tempos_em_ms
+from cronometragem.processamento import (
+    COL_CATEGORIA, COL_EVENTO, COL_HORARIO, COL_PILOTO, COL_S1, COL_S3, COL_TT, COL_VOLTA, COLS_TEMPO,
+)
+
+# --- CLASSIFICAÇÃO DAS VOLTAS ---
+# Uma passada vetorizada por etapa, com as voltas de cada piloto (por sessão) em
+# ordem. Nas exportações, a volta de entrada nos boxes chega sem o S3 e a de
+# saída sem o S1 (com o tempo parado incluído); lacunas no horário de passagem
+# também indicam que o carro saiu da pista.
+COL_SAIDA, COL_ENTRADA = "Volta de Saída", "Volta de Entrada"
+COL_BOXE, COL_LENTA, COL_VALIDA = "Volta de Boxe", "Volta Lenta", "Volta Válida"
+COLS_CLASSIFICACAO = [COL_SAIDA, COL_ENTRADA, COL_BOXE, COL_LENTA, COL_VALIDA]
+
+QUANTIL_REFERENCIA = 0.5  # referência do piloto na sessão: este quantil das voltas completas
+FATOR_LENTA = 1.07        # acima disso da referência: volta lenta (bandeira amarela, tráfego, erro)
+FATOR_BOXE = 1.5          # volta com setor faltando e acima disso: inclui parada nos boxes
+LACUNA_HORARIO_MS = 30_000
+
+def classificar_voltas(df):
+    """Acrescenta as colunas de `COLS_CLASSIFICACAO` (booleanas) a uma etapa padrão ou compacta.
+
+    Saída: S1 faltando, volta após uma de entrada ou após lacuna no horário.
+    Entrada: S3 faltando ou volta antes de lacuna no horário. Boxe: setor
+    faltando e tempo acima de `FATOR_BOXE` x referência. Lenta: completa, mas
+    acima de `FATOR_LENTA` x referência. Um setor só conta como faltando se o
+    piloto o tem na maioria das voltas da sessão. A referência é uma só por
+    piloto e sessão (quantil `QUANTIL_REFERENCIA` das voltas completas), para
+    que uma sequência de voltas lentas sob bandeira amarela não a puxe para cima.
+    """
+    df = df.drop(columns=COLS_CLASSIFICACAO, errors="ignore")
+    chaves = [COL_CATEGORIA, COL_EVENTO, COL_PILOTO]
+    n = len(df)
+    if n == 0 or not set(chaves + [COL_VOLTA, COL_TT]) <= set(df.columns):
+        return df.assign(**{c: pd.Series(c == COL_VALIDA, index=df.index, dtype=bool) for c in COLS_CLASSIFICACAO})
+
+    grupos = df.groupby(chaves, observed=True, sort=False).ngroup().to_numpy()
+    ordem = np.lexsort((df[COL_VOLTA].astype("float64").to_numpy(na_value=np.nan), grupos))
+    g = grupos[ordem]
+    mesmo_anterior = np.r_[False, g[1:] == g[:-1]]
+
+    tt = tempos_em_ms(df[COL_TT])[ordem]
+    setores = {c: np.isnan(tempos_em_ms(df[c])[ordem]) for c in COLS_TEMPO[1:] if c in df.columns}
+    # Setor "esperado": presente na maioria das voltas do piloto na sessão.
+    esperado = {c: pd.Series(~falta).groupby(g).transform("mean").to_numpy() > 0.5 for c, falta in setores.items()}
+    faltando = {c: falta & esperado[c] for c, falta in setores.items()}
+    algum_faltando = np.logical_or.reduce(list(faltando.values())) if faltando else np.zeros(n, bool)
+
+    limpo = pd.Series(np.where(algum_faltando, np.nan, tt))
+    referencia = limpo.groupby(g).transform("quantile", QUANTIL_REFERENCIA).to_numpy()
+    # Piloto sem nenhuma volta completa: usa o mesmo quantil de todas as voltas dele.
+    referencia = np.where(np.isnan(referencia), pd.Series(tt).groupby(g).transform("quantile", QUANTIL_REFERENCIA).to_numpy(), referencia)
+
+    lacuna_antes = np.zeros(n, bool)
+    if COL_HORARIO in df.columns:
+        horario = horario_em_ms(df[COL_HORARIO])[ordem]
+        intervalo = horario - np.r_[np.nan, horario[:-1]]
+        # Intervalo negativo (virada da meia-noite) ou vazio não conta como lacuna.
+        lacuna_antes = mesmo_anterior & (intervalo - tt > LACUNA_HORARIO_MS)
+    lacuna_depois = np.r_[lacuna_antes[1:], False]
+
+    entrada = faltando.get(COL_S3, np.zeros(n, bool)) | lacuna_depois
+    entrada_antes = mesmo_anterior & np.r_[False, entrada[:-1]]
+    saida = faltando.get(COL_S1, np.zeros(n, bool)) | entrada_antes | lacuna_antes
+    boxe = algum_faltando & (tt > FATOR_BOXE * referencia)
+    lenta = ~(saida | entrada | boxe) & (tt > FATOR_LENTA * referencia)
+    valida = ~(saida | entrada | boxe | lenta) & ~np.isnan(tt)
+
+    df = df.copy()
+    for col, valores in zip(COLS_CLASSIFICACAO, (saida, entrada, boxe, lenta, valida)):
+        resultado = np.empty(n, bool)
+        resultado[ordem] = valores
+        df[col] = resultado
+    return df
@@ -0,0 +1,48 @@
+"""Simula uma sessão ao vivo: escreve uma exportação sintética volta a volta em um arquivo.
+
+Uso: python scripts/simular_ao_vivo.py "TESTE - TREINO 1 - LAPTIMES.CSV" [--pilotos 10] [--voltas 15] [--intervalo 1.0]
+
+Aponte o "📡 Modo Ao Vivo" da barra lateral para o arquivo gerado.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.sintetico import CABECALHO, linhas_voltas, nome_piloto  # noqa: E402
+
+
+def escrever(f, linhas):
+    f.write(("\r\n".join(linhas) + "\r\n").encode("utf-8"))
+    f.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("arquivo")
+    parser.add_argument("--pilotos", type=int, default=10)
+    parser.add_argument("--voltas", type=int, default=15)
+    parser.add_argument("--intervalo", type=float, default=1.0, help="segundos entre cada volta escrita")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with open(args.arquivo, "wb") as f:
+        escrever(f, ["Resultados ao vivo (simulação)", "", CABECALHO])
+        # Mesmo layout da exportação: bloco de cada piloto com o nome seguido das voltas.
+        for i in range(args.pilotos):
+            escrever(f, [f'"{nome_piloto(i)}","","","","","",""'])
+            hora = 9 * 3600000 + rng.randint(0, 60000)
+            for volta in range(1, args.voltas + 1):
+                linhas, hora = linhas_voltas(rng, volta, 1, hora)
+                escrever(f, linhas)
+                print(f"{nome_piloto(i)} | volta {volta}", flush=True)
+                time.sleep(args.intervalo)
+
+
+if __name__ == "__main__":
+    main()